@@ -8,6 +8,7 @@ import logging
 import logging.handlers
 import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Callable, Type
@@ -62,6 +63,7 @@ class MemoriaConfig(BaseModel):
     estrategia_liberacion: str = "agresiva"
     swap_agresivo: bool = True
     compresion_habilitada: bool = True
+    compresion_aplicada: bool = False
     limite_procesos_pesados: int = 10
 
 
@@ -71,6 +73,7 @@ class KernelConfig(BaseModel):
     aggressive_level: int = 5
     cache_optimization: bool = True
     pagefile_tuning: bool = True
+    nvme_scheduler: str = "none"
     memory_protection: bool = False
     power_throttle: bool = False
 
@@ -90,6 +93,7 @@ class GPUConfig(BaseModel):
     uso_umbral: int = 90
     boost_dinamico: bool = True
     power_limit_tuning: bool = True
+    sample_interval: float = 2.0
 
 
 class ServiciosConfig(BaseModel):
@@ -112,7 +116,7 @@ class GUIConfig(BaseModel):
     fps_target: int = 60
     animaciones_habilitadas: bool = True
     notificaciones_habilitadas: bool = True
-    logs_gui_max: int = 10000
+    logs_gui_max: int = 2000
     graficar_metricas: bool = True
     show_temp_in_tray: bool = False
     game_list: List[str] = []
@@ -208,6 +212,8 @@ class ConfigManager:
         self.config: AppConfig = self._load_config()
         self.lock: threading.RLock = threading.RLock()
         self.watchers: Dict[str, List[Callable]] = {}
+        self._batch_depth: int = 0
+        self._batch_pendiente: bool = False
         
         self._observer = Observer()
         self._observer.schedule(ConfigChangeHandler(self), str(self.config_file.parent), recursive=False)
@@ -246,9 +252,25 @@ class ConfigManager:
             for k in keys[:-1]:
                 config = getattr(config, k)
             setattr(config, keys[-1], value)
-            self.save()
+            if self._batch_depth:
+                self._batch_pendiente = True
+            else:
+                self.save()
             self._notificar_watchers(key, value)
     
+    @contextmanager
+    def batch(self):
+        """Agrupa varios `set` en una única escritura del archivo de configuración."""
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._batch_pendiente:
+                    self._batch_pendiente = False
+                    self.save()
+    
     def save(self) -> None:
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -293,6 +315,15 @@ class Task:
 
     def run(self) -> None:
         self.last_run = datetime.now()
+        # Latido del gestor dueño de la tarea: con un único hilo de scheduler es
+        # la señal de vida de cada módulo
+        gestor = getattr(self.action, '__self__', None)
+        if gestor is not None and hasattr(gestor, 'ultimo_latido'):
+            gestor.ultimo_latido = self.last_run
+            gestor._last_heartbeat = time.monotonic()
+            # Un gestor en pausa sigue latiendo, pero sus tareas no se ejecutan
+            if getattr(gestor, 'paused', False):
+                return
         self.action()
 
 
@@ -470,6 +501,8 @@ class BaseGestor(ABC):
 
         # Salud del módulo
         self.ultimo_latido: datetime = datetime.now()
+        # Mismo latido en reloj monotónico, para comprobaciones frecuentes sin aritmética de datetime
+        self._last_heartbeat: float = time.monotonic()
         self.contador_ejecuciones: int = 0
         self.contador_errores: int = 0
         self.tiempo_promedio_ejecucion: float = 0
@@ -7,6 +7,7 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any, Type
 from dataclasses import dataclass, field
 import json
+import sys
 import threading
 from pathlib import Path
 import hashlib
@@ -50,6 +51,17 @@ class EventoAvanzado:
         }
 
 
+# Tipos de evento con reacción coordinada en el orquestador. Internados: los
+# gestores emiten y el orquestador busca exactamente el mismo objeto str.
+EV_MEMORIA_CRITICA = sys.intern("MEMORIA_CRITICA")
+EV_CPU_DESBALANCE_CRITICO = sys.intern("DESBALANCE_CPU_CRITICO")
+EV_GPU_TEMPERATURA_CRITICA = sys.intern("GPU_TEMPERATURA_CRITICA")
+EV_LATENCIA_CRITICA = sys.intern("LATENCIA_CRITICA")
+EV_SERVICIO_DETENIDO = sys.intern("SERVICIO_DETENIDO")
+EV_DISCO_LLENO = sys.intern("DISCO_LLENO")
+EV_BATERIA_BAJA = sys.intern("BATERIA_BAJA")
+
+
 # ============================================================================
 # EVENT SOURCING (de event_sourcing.py)
 # ============================================================================
@@ -4,6 +4,7 @@ Gestor avanzado de CPU con balanceo inteligente, afinidad dinámica, predicción
 y gestión de prioridades de procesamiento.
 """
 from base_gestor import BaseGestor, event_bus, Task, scheduler
+from core_events import EV_CPU_DESBALANCE_CRITICO
 import psutil
 import os
 from typing import Dict, List, Tuple, Any, Set
@@ -241,7 +242,7 @@ class GestorCPU(BaseGestor):
         if stats['desbalance'] > 40 and stats['promedio'] > 50:
             anomalias['desbalance_critico'] = True
             self.registrar_evento(
-                "DESBALANCE_CPU_CRITICO",
+                EV_CPU_DESBALANCE_CRITICO,
                 f"Desbalance: {stats['desbalance']:.1f}%, "
                 f"Min: {stats['minima']:.1f}%, Max: {stats['maxima']:.1f}%",
                 "WARNING",
@@ -424,6 +425,10 @@ class GestorCPU(BaseGestor):
         anomalias = self.detectar_anomalias_cpu(stats)
         
         return {
+            # Valores planos que el orquestador consulta en cada ciclo
+            'metricas_planas': {
+                'cpu_pct': float(stats.get('promedio', 0))
+            },
             'nucleos': {
                 'total': self.cpu_total,
                 'fisicos': self.cpu_fisico
@@ -4,6 +4,7 @@ Gestor avanzado de disco con optimización de I/O, prioridades de escritura,
 caché inteligente y desfragmentación predictiva.
 """
 from base_gestor import BaseGestor
+from core_events import EV_DISCO_LLENO
 import psutil
 import os
 import platform
@@ -190,7 +191,7 @@ class GestorDisco(BaseGestor):
             for disco, info in discos.items():
                 if info['porcentaje_uso'] > self.umbral_uso:
                     self.registrar_evento(
-                        "DISCO_LLENO",
+                        EV_DISCO_LLENO,
                         f"{disco}: {info['porcentaje_uso']:.1f}% usado",
                         "WARNING",
                         prioridad=8
@@ -4,15 +4,66 @@ Gestor avanzado de GPU con soporte NVIDIA, AMD e Intel, optimización dinámica,
 overclocking seguro, undervolting y gestión térmica avanzada.
 """
 from base_gestor_Version2 import BaseGestor
+from core_events import EV_GPU_TEMPERATURA_CRITICA
 from reliability_utils import circuit_breaker
 import subprocess
-from typing import Optional, Dict, List
-import re
+import importlib
+import os
+import glob
+import shutil
+import sys
+from typing import Optional, Dict, List, Tuple, Callable
 import threading
+import time
+import numpy as np
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import partial
 from platform_threading import PlatformAdapterFactory
 
+# pynvml es opcional: los símbolos usados en el muestreo se enlazan una sola vez al importar
+try:
+    _nvml = importlib.import_module("pynvml")
+except ImportError:
+    _nvml = None
+
+if _nvml is not None:
+    _NVML_UTIL = _nvml.nvmlDeviceGetUtilizationRates
+    _NVML_TEMP = _nvml.nvmlDeviceGetTemperature
+    _NVML_MEM = _nvml.nvmlDeviceGetMemoryInfo
+    _NVML_POWER = _nvml.nvmlDeviceGetPowerUsage
+
+# Curva de ventiladores: puntos de control (temperatura °C -> velocidad %), interpolación lineal
+_TEMPS = np.array([0, 50, 60, 70, 80, 100])
+_SPEEDS = np.array([30, 30, 40, 60, 80, 100])
+
+# La salida de las herramientas de línea de comandos no se consume
+_DEVNULL = subprocess.DEVNULL
+
+
+def _generar_sampler(num_gpus: int, paralelo: bool) -> Callable:
+    """
+    Genera un sampler especializado para `num_gpus` dispositivos: llamadas desenrolladas
+    y claves 'gpu_N' como constantes, sin bucles ni f-strings en el camino caliente.
+    """
+    lineas = ["def _sample(read, handles, submit):"]
+    if paralelo:
+        lineas += [f"    f{i} = submit(read, handles[{i}])" for i in range(num_gpus)]
+        valores = [f"f{i}.result()" for i in range(num_gpus)]
+    else:
+        valores = [f"read(handles[{i}])" for i in range(num_gpus)]
+    lineas.append("    return {" + ", ".join(f"'gpu_{i}': {v}" for i, v in enumerate(valores)) + "}")
+    
+    namespace: Dict = {}
+    exec("\n".join(lineas), namespace)
+    return namespace['_sample']
+
+def _normalizar_pci(direccion: str) -> str:
+    """Normaliza una dirección PCI (NVML usa dominio de 8 dígitos, sysfs de 4): 'dddd:bb:dd.f'."""
+    dominio, _, resto = direccion.strip().lower().partition(':')
+    return f"{int(dominio, 16):04x}:{resto}"
+
 class GestorGPU(BaseGestor):
     def __init__(self):
         super().__init__("GestorGPU")
@@ -41,40 +92,188 @@ class GestorGPU(BaseGestor):
         self.throttlings_detectados = 0
         self.perfiles_oc = {}
         
+        # Snapshot compartido de métricas (timestamp monotónico, métricas), escrito por el sampler
+        self._metric_snapshot: Tuple[float, Dict] = (0.0, {})
+        # El snapshot supera dos intervalos de muestreo (sampler parado, colgado o en pausa)
+        self.metricas_obsoletas = False
+        
         # Determinar tipo de GPU
         self.tipo_gpu = self.adapter.get_gpu_type()
         
+        # Handles NVML descubiertos una sola vez; la muestra por dispositivo se reparte en un pool
+        self._nvml_handles = self._inicializar_nvml() if self.tipo_gpu == "NVIDIA" else []
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if len(self._nvml_handles) > 1:
+            self._pool = ThreadPoolExecutor(
+                max_workers=min(len(self._nvml_handles), 8),
+                thread_name_prefix='GestorGPU-NVML'
+            )
+        self._sampler: Optional[Callable] = None
+        if self._nvml_handles:
+            self._sampler = partial(
+                _generar_sampler(len(self._nvml_handles), self._pool is not None),
+                self._sample_one,
+                tuple(self._nvml_handles),
+                self._pool.submit if self._pool is not None else None
+            )
+        
+        # Lectura directa de temperatura vía hwmon (Linux): índice NVML -> descriptor,
+        # abiertos una sola vez
+        self._hwmon_fds: Dict[int, int] = self._abrir_hwmon_temps()
+        self._ultima_velocidad_ventilador: Optional[int] = None
+        
+        # Ajustes de arranque que solo deben aplicarse una vez
+        self._boost_active = False
+        self._modo_compute_aplicado = self._configuracion_inicial_nvml()
+        
+        # Muestreo en thread dedicado: un NVML colgado no bloquea al scheduler
+        self._detener_sampler = threading.Event()
+        self._sampler_thread = threading.Thread(target=self._sampler_loop, daemon=True, name='GestorGPU-Sampler')
+        self._sampler_thread.start()
+        
         self.logger.info(f"GestorGPU: Adapter seleccionado={self.adapter.__class__.__name__}, GPU tipo={self.tipo_gpu}")
 
+    def _inicializar_nvml(self) -> List:
+        """Inicializa NVML y obtiene los handles de todos los dispositivos."""
+        if _nvml is None:
+            return []
+        try:
+            _nvml.nvmlInit()
+            return [_nvml.nvmlDeviceGetHandleByIndex(i) for i in range(_nvml.nvmlDeviceGetCount())]
+        except Exception as e:
+            self.logger.debug(f"NVML no disponible: {e}")
+            return []
+
+    def _configuracion_inicial_nvml(self) -> bool:
+        """Activa persistence mode y compute mode exclusivo en todos los dispositivos NVML."""
+        if not self._nvml_handles:
+            return False
+        try:
+            for handle in self._nvml_handles:
+                _nvml.nvmlDeviceSetPersistenceMode(handle, 1)
+                _nvml.nvmlDeviceSetComputeMode(handle, _nvml.NVML_COMPUTEMODE_EXCLUSIVE_PROCESS)
+            
+            self.registrar_evento(
+                "MEMORIA_GPU_OPTIMIZADA",
+                "Persistence mode y modo compute exclusivo activados",
+                "INFO"
+            )
+            return True
+        except Exception as e:
+            self.logger.debug(f"Error en configuración inicial NVML: {e}")
+            return False
+
+    def _abrir_hwmon_temps(self) -> Dict[int, int]:
+        """
+        Abre el `temp1_input` de hwmon de cada GPU NVML en Linux. El dispositivo
+        hwmon se empareja con su GPU por dirección PCI, no por orden de enumeración.
+        """
+        if not sys.platform.startswith('linux') or not self._nvml_handles:
+            return {}
+        
+        indices = {}
+        for idx, handle in enumerate(self._nvml_handles):
+            try:
+                bus_id = _nvml.nvmlDeviceGetPciInfo(handle).busId
+                if isinstance(bus_id, bytes):
+                    bus_id = bus_id.decode()
+                indices[_normalizar_pci(bus_id)] = idx
+            except Exception as e:
+                self.logger.debug(f"Sin dirección PCI para gpu:{idx}: {e}")
+        
+        fds = {}
+        for device_path in sorted(glob.glob('/sys/class/hwmon/hwmon*/device')):
+            try:
+                idx = indices.get(_normalizar_pci(os.path.basename(os.path.realpath(device_path))))
+                if idx is None or idx in fds:
+                    continue
+                temp_path = os.path.join(os.path.dirname(device_path), 'temp1_input')
+                fds[idx] = os.open(temp_path, os.O_RDONLY)
+            except (OSError, ValueError) as e:
+                self.logger.debug(f"No se pudo abrir {device_path}: {e}")
+        return fds
+
+    def _read_temp_fast(self, idx: int = 0) -> Optional[float]:
+        """Lee la temperatura (°C) de la GPU NVML `idx` directamente de hwmon, sin NVML."""
+        fd = self._hwmon_fds.get(idx)
+        if fd is None:
+            return None
+        try:
+            return int(os.pread(fd, 16, 0)) / 1000.0
+        except (OSError, ValueError):
+            return None
+
+    def _sample_one(self, handle) -> Dict:
+        """Lee las métricas de un único dispositivo NVML."""
+        util = _NVML_UTIL(handle)
+        temp = _NVML_TEMP(handle, 0) # 0 for GPU core
+        mem_info = _NVML_MEM(handle)
+        power = _NVML_POWER(handle) / 1000.0 # Convert mW to W
+        
+        return {
+            'uso_gpu_pct': util.gpu,
+            'temperatura_c': temp,
+            'memoria_usada_mb': mem_info.used / (1024**2),
+            'memoria_total_mb': mem_info.total / (1024**2),
+            'potencia_w': power,
+            'uso_memoria_pct': mem_info.used / mem_info.total * 100 if mem_info.total else 0,
+        }
+
     @circuit_breaker(failure_threshold=3, timeout=30.0)
     def obtener_metricas_nvidia_detalladas(self) -> Optional[Dict]:
         """Obtiene métricas detalladas de GPU NVIDIA usando la librería pynvml."""
         try:
-            from pynvml import nvmlInit, nvmlDeviceGetCount, nvmlDeviceGetHandleByIndex, nvmlDeviceGetUtilizationRates, nvmlDeviceGetTemperature, nvmlDeviceGetMemoryInfo, nvmlDeviceGetPowerUsage
-            
-            nvmlInit()
-            metrics = {}
-            device_count = nvmlDeviceGetCount()
-            
-            for i in range(device_count):
-                handle = nvmlDeviceGetHandleByIndex(i)
-                util = nvmlDeviceGetUtilizationRates(handle)
-                temp = nvmlDeviceGetTemperature(handle, 0) # 0 for GPU core
-                mem_info = nvmlDeviceGetMemoryInfo(handle)
-                power = nvmlDeviceGetPowerUsage(handle) / 1000.0 # Convert mW to W
-                
-                metrics[f'gpu_{i}'] = {
-                    'uso_gpu_pct': util.gpu,
-                    'temperatura_c': temp,
-                    'memoria_usada_mb': mem_info.used / (1024**2),
-                    'memoria_total_mb': mem_info.total / (1024**2),
-                    'potencia_w': power,
-                }
-            return metrics
+            return self._sampler() if self._sampler is not None else {}
         except Exception as e:
             self.logger.error(f"Error obteniendo métricas de NVIDIA con pynvml: {e}")
             raise
 
+    def _muestrear_metricas(self) -> Dict:
+        """Toma una muestra completa de métricas (NVML si está disponible, adapter en otro caso)."""
+        if self._nvml_handles:
+            try:
+                metricas = self.obtener_metricas_nvidia_detalladas()
+                if metricas:
+                    return metricas
+            except Exception:
+                pass
+        return self.adapter.get_gpu_metrics() or {}
+
+    def _sampler_loop(self) -> None:
+        """Muestrea métricas periódicamente y publica el snapshot por intercambio de referencia."""
+        intervalo = max(1.0, self.config.gpu.sample_interval)
+        while self.activo and not self._detener_sampler.is_set():
+            if not self.paused:
+                try:
+                    self._metric_snapshot = (time.monotonic(), self._muestrear_metricas())
+                except Exception as e:
+                    self.logger.debug(f"Error en sampler de GPU: {e}")
+            self._detener_sampler.wait(intervalo)
+
+    def _get_metrics_cached(self, permitir_obsoletas: bool = False) -> Dict:
+        """
+        Retorna la última muestra publicada por el sampler (lectura sin lock, nunca
+        muestrea en línea). Si tiene más de dos intervalos se considera obsoleta y,
+        salvo `permitir_obsoletas`, se retorna {} para no actuar sobre ella.
+        """
+        ts, metricas = self._metric_snapshot
+        if not ts:
+            # El sampler aún no ha publicado ninguna muestra
+            return {}
+        intervalo = max(1.0, self.config.gpu.sample_interval)
+        edad = time.monotonic() - ts
+        obsoletas = edad > 2 * intervalo
+        if obsoletas != self.metricas_obsoletas:
+            # Un único log por transición, no por lectura
+            self.metricas_obsoletas = obsoletas
+            if obsoletas:
+                self.logger.warning(f"Métricas de GPU obsoletas: el sampler no publica desde hace {edad:.1f}s")
+            else:
+                self.logger.info("Métricas de GPU al día de nuevo")
+        if obsoletas and not permitir_obsoletas:
+            return {}
+        return metricas
+
     def aplicar_undervolt_nvidia(self, offset_mv: int = -100):
         """Aplica undervolting a GPU NVIDIA."""
         # Esta funcionalidad es compleja y a menudo no está expuesta directamente.
@@ -85,7 +284,8 @@ class GestorGPU(BaseGestor):
         try:
             subprocess.run(
                 ["nvidia-settings", "-a", f"[gpu:0]/GPUGraphicsClockOffset[3]={offset_mv}"],
-                capture_output=True,
+                stdout=_DEVNULL,
+                stderr=_DEVNULL,
                 timeout=5
             )
             
@@ -117,25 +317,27 @@ class GestorGPU(BaseGestor):
         except Exception as e:
             self.logger.debug(f"Error aplicando OC: {e}")
     
-    def gestionar_curva_ventiladores(self, temperatura: float):
-        """Gestiona curva de ventiladores según temperatura."""
+    def gestionar_curva_ventiladores(self, temperatura: Optional[float] = None):
+        """Gestiona curva de ventiladores según temperatura (lectura rápida vía hwmon si no se indica)."""
         try:
-            if temperatura < 50:
-                velocidad = 30
-            elif temperatura < 60:
-                velocidad = 40
-            elif temperatura < 70:
-                velocidad = 60
-            elif temperatura < 80:
-                velocidad = 80
-            else:
-                velocidad = 100
+            if temperatura is None:
+                temperatura = self._read_temp_fast(0)
+            if temperatura is None:
+                temperatura = self._get_metrics_cached().get('gpu_0', {}).get('temperatura_c')
+            if temperatura is None:
+                return
+            
+            velocidad = int(np.interp(temperatura, _TEMPS, _SPEEDS))
+            if velocidad == self._ultima_velocidad_ventilador:
+                return
+            self._ultima_velocidad_ventilador = velocidad
             
             if self.tipo_gpu == "NVIDIA":
                 subprocess.run(
                     ["nvidia-settings", "-a", f"[gpu:0]/GPUFanControlState=1",
                      "-a", f"[fan:0]/GPUTargetFanSpeed={velocidad}"],
-                    capture_output=True,
+                    stdout=_DEVNULL,
+                    stderr=_DEVNULL,
                     timeout=5
                 )
         
@@ -158,15 +360,18 @@ class GestorGPU(BaseGestor):
             if self.tipo_gpu == "NVIDIA":
                 subprocess.run(
                     ["nvidia-smi", "-pl", str(power_limit)],
-                    capture_output=True,
+                    stdout=_DEVNULL,
+                    stderr=_DEVNULL,
                     timeout=5
                 )
         
         except Exception as e:
             self.logger.debug(f"Error ajustando power limit: {e}")
     
-    def detectar_throttling(self, metricas: Dict) -> bool:
+    def detectar_throttling(self, metricas: Optional[Dict] = None) -> bool:
         """Detecta si hay throttling térmico o de potencia."""
+        if metricas is None:
+            metricas = self._get_metrics_cached()
         try:
             for gpu_id, info in metricas.items():
                 temperatura = info.get('temperatura_c', 0)
@@ -186,13 +391,18 @@ class GestorGPU(BaseGestor):
     
     def optimizar_memoria_gpu(self):
         """Optimiza uso de memoria de GPU."""
+        if self._modo_compute_aplicado:
+            return
+        
         try:
             if self.tipo_gpu == "NVIDIA":
                 subprocess.run(
                     ["nvidia-smi", "--compute-mode=EXCLUSIVE_PROCESS"],
-                    capture_output=True,
+                    stdout=_DEVNULL,
+                    stderr=_DEVNULL,
                     timeout=5
                 )
+                self._modo_compute_aplicado = True
                 
                 self.registrar_evento(
                     "MEMORIA_GPU_OPTIMIZADA",
@@ -205,12 +415,14 @@ class GestorGPU(BaseGestor):
     
     def optimizar_gpu_dinamico(self):
         """Optimiza GPU con boost dinámico y power management."""
-        metricas = self.adapter.get_gpu_metrics()
+        metricas = self._get_metrics_cached()
         
         if not metricas:
             return
         
         try:
+            throttling = False
+            temperatura_critica = self.umbrales['temperatura_critica']
             for gpu_id, gpu_info in metricas.items():
                 uso_gpu = gpu_info.get('uso_gpu_pct', 0)
                 temperatura = gpu_info.get('temperatura_c', 0)
@@ -228,10 +440,14 @@ class GestorGPU(BaseGestor):
                     'memoria': memoria_pct
                 })
                 
-                if temperatura > self.umbrales['temperatura_critica']:
+                # Misma condición que detectar_throttling, evaluada en la misma pasada
+                throttling |= (temperatura > temperatura_critica
+                               or gpu_info.get('potencia', {}).get('uso_pct', 0) > 95)
+                
+                if temperatura > temperatura_critica:
                     self.throttlings_detectados += 1
                     self.registrar_evento(
-                        "GPU_TEMPERATURA_CRITICA",
+                        EV_GPU_TEMPERATURA_CRITICA,
                         f"{gpu_id}: {temperatura:.1f}°C - Throttling probable",
                         "ERROR",
                         prioridad=10
@@ -252,19 +468,27 @@ class GestorGPU(BaseGestor):
                 if self.boost_dinamico and uso_gpu < 40 and temperatura < 60:
                     self._activar_boost_gpu()
                     self.optimizaciones_aplicadas += 1
-                
-                if self.detectar_throttling(metricas):
-                    self.aplicar_undervolt_nvidia(-120)
+            
+            if throttling:
+                self.aplicar_undervolt_nvidia(-120)
         
         except Exception as e:
             self.registrar_evento("ERROR_OPTIMIZACION_GPU", str(e), "WARNING")
     
     def _activar_boost_gpu(self):
         """Activa boost de GPU si está disponible."""
+        if self._boost_active:
+            return
+        
         try:
-            if self.tipo_gpu == "NVIDIA":
-                subprocess.run(["nvidia-smi", "-pm", "1"], capture_output=True, timeout=5)
-                subprocess.run(["nvidia-smi", "-lgc", "0,2100"], capture_output=True, timeout=5)
+            if self._nvml_handles:
+                for handle in self._nvml_handles:
+                    _nvml.nvmlDeviceSetGpuLockedClocks(handle, 0, 2100)
+                self._boost_active = True
+            elif self.tipo_gpu == "NVIDIA":
+                subprocess.run(["nvidia-smi", "-pm", "1"], stdout=_DEVNULL, stderr=_DEVNULL, timeout=5)
+                subprocess.run(["nvidia-smi", "-lgc", "0,2100"], stdout=_DEVNULL, stderr=_DEVNULL, timeout=5)
+                self._boost_active = True
         except:
             pass
     
@@ -275,13 +499,15 @@ class GestorGPU(BaseGestor):
                 subprocess.run(
                     ["nvidia-settings", "-a", "[gpu:0]/GPUFanControlState=1", 
                      "-a", "[fan:0]/GPUTargetFanSpeed=100"],
-                    capture_output=True,
+                    stdout=_DEVNULL,
+                    stderr=_DEVNULL,
                     timeout=5
                 )
             elif self.tipo_gpu == "AMD":
                 subprocess.run(
                     ["rocm-smi", "--setfan", "100"],
-                    capture_output=True,
+                    stdout=_DEVNULL,
+                    stderr=_DEVNULL,
                     timeout=5
                 )
         except:
@@ -289,17 +515,13 @@ class GestorGPU(BaseGestor):
     
     def obtener_estadisticas(self) -> Dict:
         """Retorna estadísticas de GPU."""
-        metricas = None
-        if self.tipo_gpu == "NVIDIA":
-            metricas = self.obtener_metricas_nvidia_detalladas()
-        elif self.tipo_gpu == "AMD":
-            # Suponiendo que existe un método similar para AMD
-            # metricas = self.obtener_metricas_amd_detalladas()
-            pass
+        metricas = self._get_metrics_cached(permitir_obsoletas=True)
         
         return {
             'tipo_gpu': self.tipo_gpu,
             'metricas': metricas or {},
+            'metricas_obsoletas': self.metricas_obsoletas,
+            'edad_metricas_s': time.monotonic() - self._metric_snapshot[0],
             'umbrales': self.umbrales,
             'perfiles_oc': self.perfiles_oc,
             'estadisticas': {
@@ -312,12 +534,21 @@ class GestorGPU(BaseGestor):
     
     def _check_dependencies(self) -> bool:
         """Verifica si las librerías necesarias para la GPU están disponibles."""
-        try:
-            import pynvml
+        if _nvml is not None:
             return True
-        except ImportError:
-            import shutil
-            return shutil.which("nvidia-smi") is not None or shutil.which("rocm-smi") is not None
+        return shutil.which("nvidia-smi") is not None or shutil.which("rocm-smi") is not None
+
+    def _vaciar_directorio(self, ruta: str) -> None:
+        """Elimina el contenido de `ruta` en una sola pasada de scandir (la caché suele ser plana)."""
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entrada.path)
+                    else:
+                        os.unlink(entrada.path)
+                except OSError as e:
+                    self.logger.debug(f"No se pudo eliminar {entrada.path}: {e}")
 
     def limpiar_cache_shaders(self):
         """Limpia la caché de shaders de la GPU."""
@@ -338,13 +569,28 @@ class GestorGPU(BaseGestor):
         
         rutas_a_limpiar = rutas_cache.get(self.tipo_gpu, [])
         for ruta in rutas_a_limpiar:
+            ruta = os.path.normpath(ruta)
             try:
-                if os.path.exists(ruta):
-                    shutil.rmtree(ruta)
+                if os.path.isdir(ruta):
+                    self._vaciar_directorio(ruta)
                     self.registrar_evento("CACHE_SHADERS_LIMPIADO", f"Caché de shaders limpiado en: {ruta}", "INFO")
             except Exception as e:
                 self.logger.warning(f"Error limpiando caché de shaders en {ruta}: {e}")
 
+    def detener(self):
+        """Detiene el gestor, el sampler y libera los recursos de muestreo."""
+        super().detener()
+        if getattr(self, '_detener_sampler', None) is not None:
+            self._detener_sampler.set()
+        if getattr(self, '_pool', None) is not None:
+            self._pool.shutdown(wait=False)
+        for fd in getattr(self, '_hwmon_fds', {}).values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._hwmon_fds = {}
+
     def setup_tasks(self):
         """Configura y añade las tareas de optimización de GPU al scheduler."""
         if not self.activo:
@@ -352,5 +598,9 @@ class GestorGPU(BaseGestor):
         
         from base_gestor_Version2 import Task # Importación local
         self.scheduler.add_task(Task("optimizar_gpu_dinamico", self.optimizar_gpu_dinamico, timedelta(seconds=10)))
-        self.scheduler.add_task(Task("optimizar_memoria_gpu", self.optimizar_memoria_gpu, timedelta(seconds=60)))
+        # La curva solo actúa sobre NVIDIA (nvidia-settings)
+        if self.tipo_gpu == "NVIDIA" and self._nvml_handles:
+            self.scheduler.add_task(Task("gestionar_curva_ventiladores", self.gestionar_curva_ventiladores, timedelta(seconds=2)))
+        if not self._modo_compute_aplicado:
+            self.scheduler.add_task(Task("optimizar_memoria_gpu", self.optimizar_memoria_gpu, timedelta(seconds=60)))
         self.scheduler.add_task(Task("limpiar_cache_shaders", self.limpiar_cache_shaders, timedelta(days=7)))
@@ -3,15 +3,19 @@
 GUI profesional avanzada con tkinter, métricas en tiempo real, tray y dashboard.
 """
 import threading
+import functools
+import time
 import sys
 import platform
 from base_gestor import BaseGestor
 from typing import Dict, Callable, List
 from datetime import datetime
+from collections import deque
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, messagebox
 from tkinter import font as tkfont
 import queue
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import pystray
@@ -27,6 +31,67 @@ try:
 except ImportError:
     HAS_TOAST = False
 
+def _load_icon():
+    """Carga y decodifica el icono de bandeja; None si no está disponible."""
+    try:
+        imagen = Image.open("1.ico")
+        imagen.load()
+        return imagen
+    except OSError:
+        return None
+
+
+# El icono se decodifica en segundo plano al importar, fuera del hilo de Tk
+_TRAY_ICON_FUTURE = None
+if HAS_PYSTRAY:
+    _icon_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='GUI-Icono')
+    _TRAY_ICON_FUTURE = _icon_loader.submit(_load_icon)
+    _icon_loader.shutdown(wait=False)
+
+# Paletas (fondo, texto, acento) por tema
+_THEMES = {
+    'dark': ('#1e1e1e', '#ffffff', '#0078d4'),
+    'light': ('#ffffff', '#000000', '#0078d4'),
+}
+
+# Icono por nivel de evento
+_ICONS = {'ERROR': '❌', 'WARNING': '⚠️', 'INFO': 'ℹ️'}
+
+
+# Extracción de métricas: etiqueta -> rutas alternativas dentro de `datos`, por orden de preferencia.
+# _PRIMERO selecciona el primer valor de un dict (p. ej. la primera GPU).
+_PRIMERO = object()
+_METRIC_PATHS = (
+    ('cpu_uso', (('cpu', 'carga_promedio'), ('cpu', 'carga', 'promedio'))),
+    ('memoria_uso', (('memoria', 'uso_actual', 'memoria_fisica', 'porcentaje'),
+                     ('memoria', 'uso_actual', 'porcentaje'), ('memoria', 'uso_actual'),
+                     ('memoria', 'memoria_fisica', 'porcentaje'))),
+    ('gpu_uso', (('gpu', 'metricas', _PRIMERO, 'uso_gpu_pct'),)),
+)
+
+
+def _resolver_ruta(datos: Dict, ruta: tuple):
+    """Recorre `ruta` dentro de `datos`; retorna el valor numérico final o None."""
+    valor = datos
+    for clave in ruta:
+        if not isinstance(valor, dict):
+            return None
+        valor = next(iter(valor.values()), None) if clave is _PRIMERO else valor.get(clave)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return None
+    return valor
+
+
+def _formatear_valor(valor) -> str:
+    """Formatea un valor con a lo sumo un decimal usando aritmética entera (enteros sin '.0')."""
+    if isinstance(valor, int):
+        return str(valor)
+    decimas = int(round(valor * 10))
+    signo = '-' if decimas < 0 else ''
+    entero, decimal = divmod(abs(decimas), 10)
+    return f"{signo}{entero}" if decimal == 0 else f"{signo}{entero}.{decimal}"
+
+
 class GUIManager(BaseGestor):
     def __init__(self):
         super().__init__("GestorGUI", intervalo_ejecucion=1)
@@ -36,20 +101,45 @@ class GUIManager(BaseGestor):
         
         self.root = tk.Tk()
         self.root.title("Optimizador de Sistema Avanzado v2.0")
-        self.root.geometry("1200x700")
         self.root.withdraw()
+        # La geometría se fija justo antes del primer deiconify, con la interfaz ya construida
+        self._geometria_aplicada = False
         
         self.theme = self.config.get('gui.theme', 'dark')
         self.animaciones_habilitadas = self.config.get('gui.animaciones_habilitadas', True)
         self.graficar_metricas = self.config.get('gui.graficar_metricas', True)
+        self.max_lineas_texto = self.config.get('gui.logs_gui_max', 2000)
         
         self.notifier = ToastNotifier() if HAS_TOAST else None
         self.icon = self._create_tray_icon() if HAS_PYSTRAY else None
         
-        self.cola_eventos = queue.Queue()
+        # Acotada al máximo de líneas visibles: sin mainloop activo no crece sin límite
+        self.cola_eventos: queue.Queue = queue.Queue(maxsize=self.max_lineas_texto)
+        # Buzón de una sola plaza: si el hilo de Tk no consumió el último diagnóstico,
+        # el nuevo lo reemplaza en lugar de acumularse
+        self._metricas_q: queue.Queue = queue.Queue(maxsize=1)
+        self._lineas_pendientes: deque = deque(maxlen=self.max_lineas_texto)
+        self._cached_ts_second = -1
+        self._cached_ts = ""
+        
+        # Variables de control: existen aunque la pestaña Control no se haya construido
+        self.var_agresivo = tk.BooleanVar()
+        self.var_autoopt = tk.BooleanVar(value=True)
+        self.var_notif = tk.BooleanVar(value=True)
+        self._espejar_var(self.var_notif, '_notif_enabled')
+        
+        # Un único worker muestra los toasts; si la cola está llena se descartan
+        self._notif_q: queue.Queue = queue.Queue(maxsize=32)
+        if self.notifier:
+            threading.Thread(target=self._notif_worker, daemon=True, name='GUI-Notificaciones').start()
+        
+        # Acciones bloqueantes fuera del hilo de Tk
+        self._work_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='gui-work')
+        
         self.info_text = None
         self.eventos_text = None
         self.metricas_labels = {}
+        self._last_metric_text: Dict[str, str] = {}
         self.graficos = {}
         
         self._setup_theme()
@@ -62,12 +152,13 @@ class GUIManager(BaseGestor):
         style = ttk.Style()
         style.theme_use('clam')
         
+        # Estilos con nombre para ambos temas, configurados una sola vez
+        for nombre, (bg, fg, _) in _THEMES.items():
+            style.configure(f'{nombre.capitalize()}.TFrame', background=bg, foreground=fg)
+        
         if self.theme == "dark":
-            bg_color = '#1e1e1e'
-            fg_color = '#ffffff'
-            accent = '#0078d4'
+            bg_color, fg_color, accent = _THEMES['dark']
             
-            style.configure('TFrame', background=bg_color, foreground=fg_color)
             style.configure('TLabel', background=bg_color, foreground=fg_color)
             style.configure('TButton', background=accent, foreground=fg_color)
             style.configure('TNotebook', background=bg_color)
@@ -76,13 +167,15 @@ class GUIManager(BaseGestor):
             self.bg_color = bg_color
             self.fg_color = fg_color
             self.accent = accent
+            self.frame_style = 'Dark.TFrame'
         else:
-            self.bg_color = '#ffffff'
-            self.fg_color = '#000000'
-            self.accent = '#0078d4'
+            self.bg_color, self.fg_color, self.accent = _THEMES['light']
+            self.frame_style = 'Light.TFrame'
     
-    def _create_image(self, width=64, height=64):
-        """Crea imagen para icono de bandeja."""
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _create_image(width=64, height=64):
+        """Crea imagen para icono de bandeja (cacheada por tamaño; usar .copy() antes de mutarla)."""
         image = Image.new('RGB', (width, height), '#0078d4')
         draw = ImageDraw.Draw(image)
         draw.rectangle((10, 10, 54, 54), outline='#ffffff', width=2)
@@ -94,10 +187,9 @@ class GUIManager(BaseGestor):
         if not HAS_PYSTRAY:
             return None
         
-        try:
-            image = Image.open("1.ico")
-        except FileNotFoundError:
-            image = self._create_image()
+        # Tanto el icono precargado como el fallback cacheado son compartidos
+        image = _TRAY_ICON_FUTURE.result()
+        image = (image if image is not None else self._create_image()).copy()
 
         menu = Menu(
             MenuItem('Modo Juego', self._toggle_game_mode),
@@ -120,17 +212,17 @@ class GUIManager(BaseGestor):
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # Whitelist Tab
-        whitelist_frame = ttk.Frame(notebook)
+        whitelist_frame = ttk.Frame(notebook, style=self.frame_style)
         notebook.add(whitelist_frame, text="Whitelist")
         self._build_whitelist_tab(whitelist_frame)
 
         # Game List Tab
-        game_list_frame = ttk.Frame(notebook)
+        game_list_frame = ttk.Frame(notebook, style=self.frame_style)
         notebook.add(game_list_frame, text="Game List")
         self._build_game_list_tab(game_list_frame)
 
         # Thermal Throttling Tab
-        thermal_frame = ttk.Frame(notebook)
+        thermal_frame = ttk.Frame(notebook, style=self.frame_style)
         notebook.add(thermal_frame, text="Thermal Throttling")
         self._build_thermal_tab(thermal_frame)
     
@@ -138,13 +230,13 @@ class GUIManager(BaseGestor):
         label = ttk.Label(parent, text="Processes to ignore:")
         label.pack(pady=5)
 
-        self.whitelist_listbox = tk.Listbox(parent)
+        self.whitelist_listbox = ttk.Treeview(parent, show='tree', height=20)
         self.whitelist_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        for process in self.config.get('gui.whitelist', []):
-            self.whitelist_listbox.insert(tk.END, process)
+        for process in tuple(self.config.get('gui.whitelist', [])):
+            self.whitelist_listbox.insert('', tk.END, text=process)
 
-        button_frame = ttk.Frame(parent)
+        button_frame = ttk.Frame(parent, style=self.frame_style)
         button_frame.pack(fill=tk.X, padx=5, pady=5)
 
         add_button = ttk.Button(button_frame, text="Add", command=self._add_to_whitelist)
@@ -163,13 +255,13 @@ class GUIManager(BaseGestor):
         label = ttk.Label(parent, text="Games for special treatment:")
         label.pack(pady=5)
 
-        self.game_list_listbox = tk.Listbox(parent)
+        self.game_list_listbox = ttk.Treeview(parent, show='tree', height=20)
         self.game_list_listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        for game in self.config.get('gui.game_list', []):
-            self.game_list_listbox.insert(tk.END, game)
+        for game in tuple(self.config.get('gui.game_list', [])):
+            self.game_list_listbox.insert('', tk.END, text=game)
 
-        button_frame = ttk.Frame(parent)
+        button_frame = ttk.Frame(parent, style=self.frame_style)
         button_frame.pack(fill=tk.X, padx=5, pady=5)
 
         add_button = ttk.Button(button_frame, text="Add", command=self._add_to_game_list)
@@ -191,7 +283,7 @@ class GUIManager(BaseGestor):
         show_temp_check.pack(pady=5)
 
         # Monitoring interval
-        interval_frame = ttk.Frame(parent)
+        interval_frame = ttk.Frame(parent, style=self.frame_style)
         interval_frame.pack(fill=tk.X, padx=5, pady=5)
         interval_label = ttk.Label(interval_frame, text="Monitoring interval (seconds):")
         interval_label.pack(side=tk.LEFT, padx=5)
@@ -200,7 +292,7 @@ class GUIManager(BaseGestor):
         interval_entry.pack(side=tk.LEFT, padx=5)
 
         # Soft threshold
-        soft_threshold_frame = ttk.Frame(parent)
+        soft_threshold_frame = ttk.Frame(parent, style=self.frame_style)
         soft_threshold_frame.pack(fill=tk.X, padx=5, pady=5)
         soft_threshold_label = ttk.Label(soft_threshold_frame, text="Soft throttling threshold (°C):")
         soft_threshold_label.pack(side=tk.LEFT, padx=5)
@@ -209,7 +301,7 @@ class GUIManager(BaseGestor):
         soft_threshold_entry.pack(side=tk.LEFT, padx=5)
 
         # Aggressive threshold
-        aggressive_threshold_frame = ttk.Frame(parent)
+        aggressive_threshold_frame = ttk.Frame(parent, style=self.frame_style)
         aggressive_threshold_frame.pack(fill=tk.X, padx=5, pady=5)
         aggressive_threshold_label = ttk.Label(aggressive_threshold_frame, text="Aggressive throttling threshold (°C):")
         aggressive_threshold_label.pack(side=tk.LEFT, padx=5)
@@ -221,18 +313,44 @@ class GUIManager(BaseGestor):
         save_button = ttk.Button(parent, text="Save", command=self._update_config)
         save_button.pack(pady=10)
 
+        # Copias Python de las variables Tk, actualizadas al escribirse
+        self._espejar_var(self.show_temp_var, '_show_temp')
+        self._espejar_var(self.interval_var, '_interval')
+        self._espejar_var(self.soft_threshold_var, '_soft_threshold')
+        self._espejar_var(self.aggressive_threshold_var, '_aggressive_threshold')
+
+        # Valores persistidos, para escribir solo lo que cambie
+        self._thermal_snapshot = self._leer_valores_thermal()
+
+    def _espejar_var(self, var: tk.Variable, atributo: str):
+        """Mantiene `atributo` sincronizado con `var` para leerlo sin pasar por Tcl."""
+        setattr(self, atributo, var.get())
+        var.trace_add('write', lambda *_: setattr(self, atributo, var.get()))
+
+    def _leer_valores_thermal(self) -> Dict:
+        return {
+            'gui.show_temp_in_tray': self._show_temp,
+            'thermal_throttling.monitoring_interval': int(self._interval),
+            'thermal_throttling.soft_threshold': int(self._soft_threshold),
+            'thermal_throttling.aggressive_threshold': int(self._aggressive_threshold),
+        }
+
     def _update_config(self):
-        self.config.set('gui.show_temp_in_tray', self.show_temp_var.get())
-        self.config.set('thermal_throttling.monitoring_interval', int(self.interval_var.get()))
-        self.config.set('thermal_throttling.soft_threshold', int(self.soft_threshold_var.get()))
-        self.config.set('thermal_throttling.aggressive_threshold', int(self.aggressive_threshold_var.get()))
+        nuevos = self._leer_valores_thermal()
+        cambios = {k: v for k, v in nuevos.items() if self._thermal_snapshot.get(k) != v}
+        if cambios:
+            with self.config.batch():
+                for clave, valor in cambios.items():
+                    self.config.set(clave, valor)
+            self._thermal_snapshot.update(cambios)
         messagebox.showinfo("Configuración", "Configuración guardada.")
 
     def _build_gui(self):
         """Construye interfaz gráfica profesional."""
         # Frame principal con padding
-        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame = ttk.Frame(self.root, padding="10", style=self.frame_style)
         main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.pack_propagate(False)
         
         # Título
         title_font = tkfont.Font(family="Helvetica", size=16, weight="bold")
@@ -245,29 +363,22 @@ class GUIManager(BaseGestor):
         notebook.pack(fill=tk.BOTH, expand=True, pady=10)
         
         # Tab 1: Dashboard en tiempo real
-        frame_dashboard = ttk.Frame(notebook)
+        frame_dashboard = ttk.Frame(notebook, style=self.frame_style)
         notebook.add(frame_dashboard, text="📊 Dashboard")
         self._build_dashboard_tab(frame_dashboard)
         
-        # Tab 2: Métricas detalladas
-        frame_metricas = ttk.Frame(notebook)
-        notebook.add(frame_metricas, text="📈 Métricas")
-        self._build_metricas_tab(frame_metricas)
-        
-        # Tab 3: Eventos
-        frame_eventos = ttk.Frame(notebook)
-        notebook.add(frame_eventos, text="📋 Eventos")
-        self._build_eventos_tab(frame_eventos)
-        
-        # Tab 4: Control
-        frame_control = ttk.Frame(notebook)
-        notebook.add(frame_control, text="⚙️ Control")
-        self._build_control_tab(frame_control)
-        
-        # Tab 5: Configuración
-        frame_config = ttk.Frame(notebook)
-        notebook.add(frame_config, text="🔧 Configuración")
-        self._build_config_tab(frame_config)
+        # Tabs 2-5: se construyen la primera vez que se muestran
+        self._tab_builders = {}
+        for texto, builder in (
+            ("📈 Métricas", self._build_metricas_tab),
+            ("📋 Eventos", self._build_eventos_tab),
+            ("⚙️ Control", self._build_control_tab),
+            ("🔧 Configuración", self._build_config_tab),
+        ):
+            frame = ttk.Frame(notebook, style=self.frame_style)
+            notebook.add(frame, text=texto)
+            self._tab_builders[str(frame)] = (frame, builder)
+        notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
         
         # Barra de estado
         self.status_bar = ttk.Label(self.root, text="Sistema optimizado ✓", 
@@ -275,7 +386,7 @@ class GUIManager(BaseGestor):
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
         # Barra de herramientas
-        toolbar = ttk.Frame(main_frame)
+        toolbar = ttk.Frame(main_frame, style=self.frame_style)
         toolbar.pack(fill=tk.X, pady=5)
         
         ttk.Button(toolbar, text="▶ Optimizar Ahora", 
@@ -286,6 +397,16 @@ class GUIManager(BaseGestor):
                   command=self._actualizar_metricas).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="💾 Guardar Diagnóstico", 
                   command=self._guardar_diagnostico).pack(side=tk.LEFT, padx=5)
+        
+        # Volcado periódico de la cola de eventos en el hilo de Tk
+        self.root.after(100, self._drain_eventos)
+    
+    def _on_tab_changed(self, event):
+        """Construye el contenido de una pestaña la primera vez que se selecciona."""
+        pendiente = self._tab_builders.pop(event.widget.select(), None)
+        if pendiente:
+            frame, builder = pendiente
+            builder(frame)
     
     def _build_dashboard_tab(self, parent):
         """Construye tab de dashboard en tiempo real."""
@@ -303,14 +424,19 @@ class GUIManager(BaseGestor):
             ('procesos_activos', 'Procesos', '#')
         ]
         
-        for row, (key, label, unidad) in enumerate(metricas):
-            ttk.Label(metricas_frame, text=label + ":").grid(row=row, column=0, sticky="w")
-            
-            self.metricas_labels[key] = ttk.Label(metricas_frame, text="--", 
-                                                  foreground=self.accent)
-            self.metricas_labels[key].grid(row=row, column=1, sticky="e")
-            
-            ttk.Label(metricas_frame, text=unidad).grid(row=row, column=2, sticky="w")
+        # Crear todas las etiquetas primero y ubicarlas en una sola pasada con coordenadas enteras
+        filas = [
+            (ttk.Label(metricas_frame, text=label + ":"),
+             ttk.Label(metricas_frame, text="--", foreground=self.accent),
+             ttk.Label(metricas_frame, text=unidad))
+            for _, label, unidad in metricas
+        ]
+        for row, ((key, _, _), (nombre, valor, unidad)) in enumerate(zip(metricas, filas)):
+            nombre.grid(row=row, column=0, sticky=tk.W)
+            valor.grid(row=row, column=1, sticky=tk.E)
+            unidad.grid(row=row, column=2, sticky=tk.W)
+            self.metricas_labels[key] = valor
+        metricas_frame.grid_propagate(False)
         
         # Frame para estado de módulos
         modulos_frame = ttk.LabelFrame(parent, text="Estado de Módulos", padding=10)
@@ -322,8 +448,8 @@ class GUIManager(BaseGestor):
             row = idx // 3
             col = idx % 3
             
-            frame = ttk.Frame(modulos_frame)
-            frame.grid(row=row, column=col, sticky="nsew", padx=5, pady=5)
+            frame = ttk.Frame(modulos_frame, style=self.frame_style)
+            frame.grid(row=row, column=col, sticky=tk.NSEW, padx=5, pady=5)
             
             ttk.Label(frame, text=modulo, font=("Helvetica", 10, "bold")).pack()
             
@@ -331,15 +457,29 @@ class GUIManager(BaseGestor):
                 frame, text="✓ Activo", foreground="green"
             )
             self.metricas_labels[f'estado_{modulo}'].pack()
+        modulos_frame.grid_propagate(False)
+    
+    def _crear_texto(self, parent) -> tk.Text:
+        """Crea un Text de solo lectura con scrollbar, sin undo ni ajuste de línea."""
+        frame = ttk.Frame(parent, style=self.frame_style)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        scrollbar = ttk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        texto = tk.Text(frame, height=20, width=100, yscrollcommand=scrollbar.set,
+                        wrap='none', undo=False, maxundo=0)
+        texto.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=texto.yview)
+        texto.config(state=tk.DISABLED)
+        return texto
     
     def _build_metricas_tab(self, parent):
         """Construye tab de métricas detalladas."""
         frame_metricas = ttk.LabelFrame(parent, text="Histórico de Métricas", padding=10)
         frame_metricas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.metricas_text = scrolledtext.ScrolledText(frame_metricas, height=20, width=100)
-        self.metricas_text.pack(fill=tk.BOTH, expand=True)
-        self.metricas_text.config(state=tk.DISABLED)
+        self.metricas_text = self._crear_texto(frame_metricas)
     
     def _build_eventos_tab(self, parent):
         """Construye tab de eventos."""
@@ -347,7 +487,7 @@ class GUIManager(BaseGestor):
         frame_eventos.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Botones de filtro
-        filter_frame = ttk.Frame(frame_eventos)
+        filter_frame = ttk.Frame(frame_eventos, style=self.frame_style)
         filter_frame.pack(fill=tk.X, padx=5, pady=5)
         
         ttk.Button(filter_frame, text="Todos").pack(side=tk.LEFT, padx=5)
@@ -355,9 +495,7 @@ class GUIManager(BaseGestor):
         ttk.Button(filter_frame, text="Advertencias").pack(side=tk.LEFT, padx=5)
         ttk.Button(filter_frame, text="Info").pack(side=tk.LEFT, padx=5)
         
-        self.eventos_text = scrolledtext.ScrolledText(frame_eventos, height=20, width=100)
-        self.eventos_text.pack(fill=tk.BOTH, expand=True)
-        self.eventos_text.config(state=tk.DISABLED)
+        self.eventos_text = self._crear_texto(frame_eventos)
     
     def _build_control_tab(self, parent):
         """Construye tab de controles."""
@@ -376,15 +514,12 @@ class GUIManager(BaseGestor):
         frame_config = ttk.LabelFrame(parent, text="Configuración del Sistema", padding=10)
         frame_config.pack(fill=tk.X, padx=5, pady=5)
         
-        self.var_agresivo = tk.BooleanVar()
         ttk.Checkbutton(frame_config, text="Modo Agresivo", 
                        variable=self.var_agresivo).pack(anchor=tk.W)
         
-        self.var_autoopt = tk.BooleanVar(value=True)
         ttk.Checkbutton(frame_config, text="Auto-optimización", 
                        variable=self.var_autoopt).pack(anchor=tk.W)
         
-        self.var_notif = tk.BooleanVar(value=True)
         ttk.Checkbutton(frame_config, text="Notificaciones", 
                        variable=self.var_notif).pack(anchor=tk.W)
     
@@ -401,7 +536,7 @@ class GUIManager(BaseGestor):
         ]
         
         for key, label, min_val, max_val in configs:
-            frame = ttk.Frame(frame_config)
+            frame = ttk.Frame(frame_config, style=self.frame_style)
             frame.pack(fill=tk.X, padx=5, pady=5)
             
             ttk.Label(frame, text=label).pack(side=tk.LEFT)
@@ -418,56 +553,124 @@ class GUIManager(BaseGestor):
             slider.config(command=actualizar)
     
     def actualizar_metricas(self, datos: Dict):
-        """Actualiza métricas en GUI."""
+        """Entrega un diagnóstico a la GUI; se aplica en el próximo tick de `_drain_eventos`."""
         try:
-            # Extraer valores
-            if 'cpu' in datos:
-                cpu_info = datos['cpu']
-                if isinstance(cpu_info, dict):
-                    promedio = cpu_info.get('carga_promedio', cpu_info.get('carga', {}).get('promedio', 0))
-                    self.metricas_labels['cpu_uso'].config(text=f"{promedio:.1f}")
-            
-            if 'memoria' in datos:
-                mem_info = datos['memoria']
-                if isinstance(mem_info, dict):
-                    uso = mem_info.get('uso_actual', mem_info.get('memoria_fisica', {}).get('porcentaje', 0))
-                    if isinstance(uso, dict):
-                        uso = uso.get('porcentaje', 0)
-                    self.metricas_labels['memoria_uso'].config(text=f"{uso:.1f}")
-            
-            if 'gpu' in datos:
-                gpu_info = datos['gpu']
-                if isinstance(gpu_info, dict):
-                    metricas = gpu_info.get('metricas', {})
-                    if metricas:
-                        uso_gpu = list(metricas.values())[0].get('uso_gpu_pct', 0) if metricas else 0
-                        self.metricas_labels['gpu_uso'].config(text=f"{uso_gpu:.1f}")
-            
+            self._metricas_q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._metricas_q.put_nowait(datos)
+        except queue.Full:
+            pass
+    
+    def _aplicar_metricas(self, datos: Dict):
+        """Actualiza las etiquetas de métricas (hilo de Tk)."""
+        try:
+            for key, rutas in _METRIC_PATHS:
+                for ruta in rutas:
+                    valor = _resolver_ruta(datos, ruta)
+                    if valor is not None:
+                        self._set_label(key, _formatear_valor(valor))
+                        break
         except Exception as e:
             self.logger.debug(f"Error actualizando métricas GUI: {e}")
     
+    def _set_label(self, key: str, text: str):
+        """Actualiza una etiqueta de métrica solo si su texto cambió."""
+        if self._last_metric_text.get(key) != text:
+            self.metricas_labels[key].config(text=text)
+            self._last_metric_text[key] = text
+    
     def agregar_evento_gui(self, tipo: str, mensaje: str, nivel: str = "INFO"):
-        """Agrega evento a la GUI."""
-        if self.eventos_text:
-            self.eventos_text.config(state=tk.NORMAL)
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            icono = "❌" if nivel == "ERROR" else "⚠️" if nivel == "WARNING" else "ℹ️"
-            texto = f"[{timestamp}] {icono} {tipo}: {mensaje}\n"
-            
-            self.eventos_text.insert(tk.END, texto)
-            self.eventos_text.see(tk.END)
-            self.eventos_text.config(state=tk.DISABLED)
+        """Encola evento para la GUI; se vuelca en el próximo tick de `_drain_eventos`.
+        
+        Con la cola llena se descarta el evento más antiguo.
+        """
+        item = (tipo, mensaje, nivel, time.time())
+        while True:
+            try:
+                self.cola_eventos.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.cola_eventos.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def _drain_eventos(self):
+        """Vuelca todos los eventos pendientes en el widget con una sola inserción."""
+        try:
+            self._aplicar_metricas(self._metricas_q.get_nowait())
+        except queue.Empty:
+            pass
+        
+        items = []
+        try:
+            while True:
+                items.append(self.cola_eventos.get_nowait())
+        except queue.Empty:
+            pass
+        
+        for tipo, mensaje, nivel, momento in items:
+            timestamp = self._timestamp(momento)
+            icono = _ICONS.get(nivel, 'ℹ️')
+            self._lineas_pendientes.append(f"[{timestamp}] {icono} {tipo}: {mensaje}")
+        
+        # Si la pestaña de eventos aún no existe, las líneas esperan (acotadas) en _lineas_pendientes
+        if self._lineas_pendientes and self.eventos_text:
+            self._insertar_texto(self.eventos_text, "\n".join(self._lineas_pendientes) + "\n")
+            self._lineas_pendientes.clear()
+        
+        self.root.after(100, self._drain_eventos)
+    
+    def _timestamp(self, momento: float) -> str:
+        """Formatea HH:MM:SS reutilizando la cadena mientras no cambie el segundo."""
+        segundo = int(momento)
+        if segundo != self._cached_ts_second:
+            self._cached_ts = time.strftime('%H:%M:%S', time.localtime(segundo))
+            self._cached_ts_second = segundo
+        return self._cached_ts
+    
+    def _insertar_texto(self, widget: tk.Text, texto: str):
+        """Inserta texto y recorta a `max_lineas_texto` dentro de un único cambio de estado."""
+        widget.config(state=tk.NORMAL)
+        widget.insert(tk.END, texto)
+        lineas = int(widget.index('end-1c').split('.')[0])
+        if lineas > self.max_lineas_texto:
+            widget.delete('1.0', f'end-{self.max_lineas_texto}l')
+        widget.see(tk.END)
+        widget.config(state=tk.DISABLED)
     
     def mostrar_notificacion(self, titulo: str, mensaje: str, duracion: int = 5):
         """Muestra notificación toast."""
-        if self.notifier and self.var_notif.get():
+        if self.notifier and self._notif_enabled:
+            try:
+                self._notif_q.put_nowait((titulo, mensaje, duracion))
+            except queue.Full:
+                pass
+    
+    def _notif_worker(self):
+        """Consume la cola de notificaciones mostrando un toast cada vez."""
+        while self.activo:
+            try:
+                titulo, mensaje, duracion = self._notif_q.get(timeout=1)
+            except queue.Empty:
+                continue
             try:
-                self.notifier.show_toast(titulo, mensaje, duration=duracion, threaded=True)
+                self.notifier.show_toast(titulo, mensaje, duration=duracion, threaded=False)
             except:
                 pass
     
     def mostrar_panel(self, icon=None, item=None):
-        """Muestra panel de control."""
+        """Muestra panel de control (sin efecto si ya está visible)."""
+        if self.root.state() != 'normal':
+            self.root.after_idle(self._mostrar_ventana)
+    
+    def _mostrar_ventana(self):
+        """Aplica la geometría inicial (una sola vez) y muestra la ventana."""
+        if not self._geometria_aplicada:
+            self.root.geometry("1200x700")
+            self._geometria_aplicada = True
         self.root.deiconify()
         self.root.lift()
     
@@ -491,37 +694,68 @@ class GUIManager(BaseGestor):
     
     def _liberar_memoria(self):
         """Libera memoria del sistema."""
-        self.mostrar_notificacion("Memoria", "Liberando... 🧹", 2)
+        self._despachar(self._do_liberar_memoria)
     
     def _optimizar_disco(self):
         """Optimiza disco."""
-        self.mostrar_notificacion("Disco", "Optimizando... 💾", 2)
+        self._despachar(self._do_optimizar_disco)
     
     def _limpiar_dns(self):
         """Limpia caché DNS."""
-        self.mostrar_notificacion("DNS", "Limpiando caché... 🌐", 2)
+        self._despachar(self._do_limpiar_dns)
     
     def _reiniciar_servicios(self):
         """Reinicia servicios."""
-        self.mostrar_notificacion("Servicios", "Reiniciando... 🔄", 2)
+        self._despachar(self._do_reiniciar_servicios)
     
     def _guardar_diagnostico(self):
         """Guarda diagnóstico completo."""
+        self._despachar(self._do_guardar_diagnostico)
+    
+    def _despachar(self, accion: Callable):
+        """Envía una acción al pool de trabajo para no bloquear el hilo de Tk."""
+        try:
+            self._work_pool.submit(accion)
+        except RuntimeError:
+            # Pool cerrado en _exit_app
+            pass
+    
+    # Cuerpos de las acciones, ejecutados en el pool. Por ahora solo notifican;
+    # el código bloqueante real (y su confirmación) irá aquí. Las notificaciones
+    # pasan por la cola de mostrar_notificacion, segura desde cualquier hilo.
+    
+    def _do_liberar_memoria(self):
+        self.mostrar_notificacion("Memoria", "Liberando... 🧹", 2)
+    
+    def _do_optimizar_disco(self):
+        self.mostrar_notificacion("Disco", "Optimizando... 💾", 2)
+    
+    def _do_limpiar_dns(self):
+        self.mostrar_notificacion("DNS", "Limpiando caché... 🌐", 2)
+    
+    def _do_reiniciar_servicios(self):
+        self.mostrar_notificacion("Servicios", "Reiniciando... 🔄", 2)
+    
+    def _do_guardar_diagnostico(self):
         self.mostrar_notificacion("Diagnóstico", "Guardando archivo... 💾", 3)
     
     def _exit_app(self, icon=None, item=None):
         """Cierra la aplicación."""
         if self.icon:
             self.icon.stop()
+        self._work_pool.shutdown(wait=False)
         self.activo = False
         self.root.quit()
     
     def ejecutar(self):
-        """Mantiene GUI actualizada."""
-        try:
-            self.root.update_idletasks()
-        except:
-            pass
+        """El mainloop de Tk ya procesa las tareas idle; el trabajo periódico va en `_periodic_tick`."""
+        pass
+    
+    def _periodic_tick(self):
+        """Tick periódico ejecutado en el hilo de Tk."""
+        self.ultimo_latido = datetime.now()
+        if self.activo:
+            self.root.after(1000, self._periodic_tick)
     
     def run(self):
         """Ejecuta la GUI."""
@@ -529,6 +763,7 @@ class GUIManager(BaseGestor):
             tray_thread = threading.Thread(target=self.icon.run, daemon=True)
             tray_thread.start()
         
+        self.root.after(1000, self._periodic_tick)
         try:
             self.root.mainloop()
         except:
@@ -7,14 +7,335 @@ from base_gestor import BaseGestor
 import ctypes
 import psutil
 import os
+import errno
 import subprocess
 from typing import Dict, List
 import platform
 import threading
+import time
 import struct
 import logging.handlers
 
 from datetime import timedelta
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+_SYS = platform.system()
+_IS_LINUX = _SYS == "Linux"
+_IS_WINDOWS = _SYS == "Windows"
+
+if _IS_WINDOWS:
+    import winreg
+else:
+    winreg = None
+
+# Todos los parámetros sysctl que este gestor modifica
+_TRACKED_KEYS = (
+    'kernel.sched_migration_cost_ns',
+    'kernel.sched_latency_ns',
+    'kernel.sched_min_granularity_ns',
+    'kernel.sched_wakeup_granularity_ns',
+    'kernel.sched_child_runs_first',
+    'vm.swappiness',
+    'vm.dirty_ratio',
+    'vm.dirty_background_ratio',
+    'net.core.netdev_max_backlog',
+    'net.core.rmem_max',
+    'net.core.wmem_max',
+    'net.core.somaxconn',
+    'net.ipv4.tcp_rmem',
+    'net.ipv4.tcp_wmem',
+    'net.ipv4.tcp_congestion_control',
+    'net.ipv4.tcp_tw_reuse',
+    'net.ipv4.tcp_fin_timeout',
+    'net.core.default_qdisc',
+)
+
+# Conversión clave -> ruta precalculada: el conjunto de claves es cerrado
+_ALL_KEYS = frozenset(_TRACKED_KEYS)
+_PROC_PATH = {key: "/proc/sys/" + key.replace('.', '/') for key in _ALL_KEYS}
+
+# Id estable de cada clave para el estado persistido: _TRACKED_KEYS solo
+# debe crecer por el final
+_KEYS_INDEX = {key: idx for idx, key in enumerate(_TRACKED_KEYS)}
+
+# Estado de rollback: registros (u16 id, i64 valor entero o -1, 32 bytes texto);
+# el id _STATE_NIVEL guarda el último nivel de agresividad aplicado. Vive en
+# /run (tmpfs): los sysctl no sobreviven a un reinicio y el estado tampoco debe
+_STATE_PATH = '/run/optimustank/state.bin'
+_STATE_RECORD = struct.Struct('<Hq32s')
+_STATE_NIVEL = 0xFFFF
+
+_ES_ROOT = getattr(os, 'geteuid', lambda: -1)() == 0
+
+
+def _proc_path(key: str) -> str:
+    """Ruta en /proc/sys de una clave sysctl."""
+    ruta = _PROC_PATH.get(key)
+    if ruta is None:
+        logger.warning(f"Clave sysctl no registrada en _TRACKED_KEYS: {key}")
+        ruta = "/proc/sys/" + key.replace('.', '/')
+    return ruta
+
+
+# Descriptores de /proc/sys abiertos una vez y reutilizados: cada escritura
+# es un pwrite en offset 0 (con sysctl_writes_strict el kernel ignora las
+# escrituras numéricas en offset > 0, así que no vale un write sin más)
+_SYSCTL_FDS: Dict[str, int] = {}
+_fds_persistentes = True
+
+
+def _write_sysctl(key: str, value: str) -> None:
+    """Escribe un parámetro sysctl directamente en /proc/sys (una syscall, sin shell)."""
+    global _fds_persistentes
+    datos = value.encode()
+    if _fds_persistentes:
+        fd = _SYSCTL_FDS.get(key)
+        if fd is None:
+            fd = os.open(_proc_path(key), os.O_WRONLY)
+            actual = _SYSCTL_FDS.setdefault(key, fd)
+            if actual != fd:
+                os.close(fd)
+                fd = actual
+        try:
+            os.pwrite(fd, datos, 0)
+            return
+        except OSError as e:
+            if e.errno != errno.ESPIPE:
+                raise
+            # El kernel no admite pwrite en procfs: abrir por escritura
+            _fds_persistentes = False
+            _cerrar_sysctl_fds()
+    
+    fd = os.open(_proc_path(key), os.O_WRONLY)
+    try:
+        os.write(fd, datos)
+    finally:
+        os.close(fd)
+
+
+def _cerrar_sysctl_fds() -> None:
+    """Cierra los descriptores persistentes de /proc/sys."""
+    while _SYSCTL_FDS:
+        _, fd = _SYSCTL_FDS.popitem()
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def _read_sysctl(key: str) -> str:
+    """Lee un parámetro sysctl directamente de /proc/sys."""
+    with open(_proc_path(key)) as f:
+        return f.read().strip()
+
+
+def _leer_parametro(key: str) -> str:
+    """Lee un parámetro de /proc/sys o, para CFS en kernels recientes, de debugfs."""
+    try:
+        return _read_sysctl(key)
+    except OSError:
+        ruta = _SCHED_DEBUGFS.get(key)
+        if ruta is None:
+            raise
+        with open(ruta) as f:
+            return f.read().strip()
+
+
+def _write_sysctl_many(ajustes: Dict[str, str]) -> List[str]:
+    """
+    Aplica un lote de parámetros sysctl y retorna las claves aplicadas.
+    Como root escribe cada fichero de /proc/sys; si no, agrupa todo en un único
+    `sudo -n sysctl -w k1=v1 k2=v2 ...` (sin credenciales cacheadas no aplica nada).
+    """
+    if not ajustes:
+        return []
+    
+    if _ES_ROOT:
+        aplicados = []
+        for key, value in ajustes.items():
+            try:
+                _write_sysctl(key, value)
+                aplicados.append(key)
+            except OSError:
+                pass
+        return aplicados
+    
+    pares = [f"{key}={value}" for key, value in ajustes.items()]
+    try:
+        resultado = subprocess.run(["sudo", "-n", "sysctl", "-w", *pares],
+                                   capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"sudo sysctl no disponible: {e}")
+        return []
+    if resultado.returncode == 0:
+        return list(ajustes)
+    # sysctl continúa tras un error: descartar solo las claves que reporta
+    errores = resultado.stderr
+    fallidas = {key for key in ajustes
+                if key in errores or _proc_path(key) in errores}
+    if not fallidas:
+        # Error ajeno a las claves (p. ej. sudo sin credenciales): nada aplicado
+        logger.debug(f"sudo sysctl falló: {errores.strip()}")
+        return []
+    return [key for key in ajustes if key not in fallidas]
+
+
+def _write_sysfs(ruta: str, valor: str) -> None:
+    """Escribe un atributo de sysfs; sin root recurre a un único `sudo -n tee`."""
+    if _ES_ROOT:
+        fd = os.open(ruta, os.O_WRONLY)
+        try:
+            os.write(fd, valor.encode())
+        finally:
+            os.close(fd)
+    else:
+        subprocess.run(["sudo", "-n", "tee", ruta], input=valor.encode(),
+                       stdout=subprocess.DEVNULL, timeout=5, check=True)
+
+
+# Desde 5.13 los knobs de CFS viven en debugfs en lugar de /proc/sys
+_SCHED_DEBUGFS = {
+    'kernel.sched_latency_ns': '/sys/kernel/debug/sched/latency_ns',
+    'kernel.sched_min_granularity_ns': '/sys/kernel/debug/sched/min_granularity_ns',
+    'kernel.sched_wakeup_granularity_ns': '/sys/kernel/debug/sched/wakeup_granularity_ns',
+    'kernel.sched_migration_cost_ns': '/sys/kernel/debug/sched/migration_cost_ns',
+}
+
+
+def _sched_nr_latency() -> int:
+    """Lee sched_nr_latency del kernel; 8 es el valor por defecto de CFS."""
+    for ruta in ('/proc/sys/kernel/sched_nr_latency', '/sys/kernel/debug/sched/nr_latency'):
+        try:
+            with open(ruta) as f:
+                return max(1, int(f.read()))
+        except (OSError, ValueError):
+            pass
+    return 8
+
+
+_NR_LATENCY = _sched_nr_latency() if _IS_LINUX else 8
+
+
+def _ajustes_cfs(latencia_ns: int) -> Dict[str, str]:
+    """
+    Deriva las granularidades de CFS de la latencia respetando
+    min_granularity = latency / nr_latency, para que el kernel no renormalice.
+    """
+    min_gran = latencia_ns // _NR_LATENCY
+    return {
+        'kernel.sched_latency_ns': str(latencia_ns),
+        'kernel.sched_min_granularity_ns': str(min_gran),
+        'kernel.sched_wakeup_granularity_ns': str(int(min_gran * 1.5)),
+    }
+
+
+# Ajustes sysctl por nivel de agresividad (índice 0 = nivel 1); cada nivel
+# pisa los valores de los anteriores
+_SYSCTL_LEVELS = (
+    MappingProxyType({
+        'vm.swappiness': '10',
+        'vm.dirty_ratio': '20',
+    }),
+    MappingProxyType({
+        'vm.swappiness': '5',
+        'vm.dirty_ratio': '15',
+        'vm.dirty_background_ratio': '5',
+    }),
+    MappingProxyType({
+        'vm.swappiness': '1',
+        'vm.dirty_ratio': '10',
+        'vm.dirty_background_ratio': '2',
+        'net.ipv4.tcp_tw_reuse': '1',
+    }),
+    MappingProxyType({
+        'vm.swappiness': '0',
+        'kernel.sched_migration_cost_ns': '5000000',
+        'net.ipv4.tcp_fin_timeout': '10',
+    }),
+    MappingProxyType({
+        **_ajustes_cfs(5000000),
+        'net.core.somaxconn': '65535',
+    }),
+)
+
+
+def _mem_percent() -> float:
+    """Porcentaje de memoria en uso a partir de MemTotal/MemAvailable de /proc/meminfo."""
+    total = disponible = None
+    with open('/proc/meminfo') as f:
+        for linea in f:
+            if linea.startswith('MemTotal:'):
+                total = float(linea.split()[1])
+            elif linea.startswith('MemAvailable:'):
+                disponible = float(linea.split()[1])
+                break
+    if not total or disponible is None:
+        return psutil.virtual_memory().percent
+    return (1 - disponible / total) * 100
+
+
+def _drop_caches(level: int = 3) -> None:
+    """sync + escritura directa en /proc/sys/vm/drop_caches, sin lanzar shells."""
+    os.sync()
+    fd = os.open("/proc/sys/vm/drop_caches", os.O_WRONLY)
+    try:
+        os.write(fd, str(level).encode())
+    finally:
+        os.close(fd)
+
+
+# SYSTEM_INFORMATION_CLASS / SYSTEM_MEMORY_LIST_COMMAND de ntdll
+_SYSTEM_MEMORY_LIST_INFORMATION = 80
+_MEMORY_EMPTY_WORKING_SETS = 2
+_MEMORY_PURGE_STANDBY_LIST = 4
+
+
+def _habilitar_privilegio(nombre: str) -> bool:
+    """Habilita un privilegio en el token del proceso (AdjustTokenPrivileges)."""
+    from ctypes import wintypes
+    
+    class LUID(ctypes.Structure):
+        _fields_ = [('LowPart', wintypes.DWORD), ('HighPart', wintypes.LONG)]
+    
+    class LUID_AND_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [('Luid', LUID), ('Attributes', wintypes.DWORD)]
+    
+    class TOKEN_PRIVILEGES(ctypes.Structure):
+        _fields_ = [('PrivilegeCount', wintypes.DWORD), ('Privileges', LUID_AND_ATTRIBUTES * 1)]
+    
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    advapi32.OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE)]
+    advapi32.AdjustTokenPrivileges.argtypes = [wintypes.HANDLE, wintypes.BOOL, ctypes.POINTER(TOKEN_PRIVILEGES),
+                                               wintypes.DWORD, ctypes.c_void_p, ctypes.c_void_p]
+    
+    TOKEN_ADJUST_PRIVILEGES, TOKEN_QUERY, SE_PRIVILEGE_ENABLED = 0x20, 0x08, 0x02
+    token = wintypes.HANDLE()
+    if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(),
+                                     TOKEN_ADJUST_PRIVILEGES | TOKEN_QUERY, ctypes.byref(token)):
+        return False
+    try:
+        luid = LUID()
+        if not advapi32.LookupPrivilegeValueW(None, nombre, ctypes.byref(luid)):
+            return False
+        privilegios = TOKEN_PRIVILEGES(1, (LUID_AND_ATTRIBUTES * 1)(LUID_AND_ATTRIBUTES(luid, SE_PRIVILEGE_ENABLED)))
+        ctypes.set_last_error(0)
+        advapi32.AdjustTokenPrivileges(token, False, ctypes.byref(privilegios), 0, None, None)
+        # ERROR_NOT_ALL_ASSIGNED (1300) si el token no posee el privilegio
+        return ctypes.get_last_error() == 0
+    finally:
+        kernel32.CloseHandle(token)
+
+
+def _purgar_memoria_sistema(comando: int) -> int:
+    """Ejecuta un SYSTEM_MEMORY_LIST_COMMAND vía NtSetSystemInformation; retorna el NTSTATUS."""
+    valor = ctypes.c_int(comando)
+    return ctypes.windll.ntdll.NtSetSystemInformation(
+        _SYSTEM_MEMORY_LIST_INFORMATION, ctypes.byref(valor), ctypes.sizeof(valor))
+
 
 class GestorKernel(BaseGestor):
     def __init__(self):
@@ -25,75 +346,215 @@ class GestorKernel(BaseGestor):
         self.auto_tuning = self.config.get('kernel.auto_tuning', True)
         self.cache_optimization = self.config.get('kernel.cache_optimization', True)
         self.pagefile_tuning = self.config.get('kernel.pagefile_tuning', True)
+        self.nvme_scheduler = self.config.get('kernel.nvme_scheduler', 'none')
+        
+        self._is_linux = _IS_LINUX
+        self._is_windows = _IS_WINDOWS
+        self._winreg = winreg
+        self._regcache = {'ts': float('-inf'), 'valores': {}}
+        self._purga_memoria_disponible = False
+        if self._is_windows:
+            try:
+                self._purga_memoria_disponible = _habilitar_privilegio("SeProfileSingleProcessPrivilege")
+            except Exception as e:
+                self.logger.debug(f"No se pudo habilitar SeProfileSingleProcessPrivilege: {e}")
         
         self.parametros_kernel = {}
-        self.optimizaciones_aplicadas = []
+        self.optimizaciones_aplicadas = set()
         self.recuperaciones_realizadas = 0
         self._original_settings = {}
+        self._last_applied_level = 0
+        self._state_fd = None
+        self._bbr_available = False
+        if _IS_LINUX:
+            self._cargar_estado()
+            self._bbr_available = self._detectar_bbr()
+        
+        # Snapshot compartido por las tareas de 30 s; la CPU se mide como delta
+        # desde la lectura anterior, así que se ceba aquí
+        self._metrics_cache = {"ts": 0.0, "cpu": 0.0, "mem": None}
+        self._prev_idle = 0.0
+        self._prev_total = 0.0
+        if _IS_LINUX:
+            self._cpu_percent_nb()
+        else:
+            psutil.cpu_percent(interval=None)
         
         self.logger.info(f"GestorKernel: Nivel agresividad={self.nivel_agresividad}, "
                         f"Modo agresivo={'ON' if self.modo_agresivo else 'OFF'}")
     
-    def _save_original_setting(self, key, value):
-        """Guarda el valor original de un parámetro antes de modificarlo."""
+    def _save_original_setting(self, key, value=None):
+        """
+        Guarda el valor original de un parámetro antes de modificarlo.
+        Sin `value` lo lee del kernel justo antes de la escritura.
+        """
         if key not in self._original_settings:
+            if value is None:
+                try:
+                    value = _leer_parametro(key)
+                except OSError:
+                    return
             self._original_settings[key] = value
+            idx = _KEYS_INDEX.get(key)
+            if idx is not None:
+                self._persistir_registro(idx, int(value) if value.isdigit() else -1, value)
 
+    def _detectar_bbr(self) -> bool:
+        """Comprueba si el kernel ofrece BBR; si no, intenta cargar tcp_bbr una vez."""
+        ruta = '/proc/sys/net/ipv4/tcp_available_congestion_control'
+        try:
+            with open(ruta) as f:
+                if 'bbr' in f.read().split():
+                    return True
+            subprocess.run(["modprobe", "tcp_bbr"], capture_output=True, timeout=10, check=False)
+            with open(ruta) as f:
+                return 'bbr' in f.read().split()
+        except Exception as e:
+            self.logger.debug(f"No se pudo comprobar BBR: {e}")
+            return False
+    
+    def _cargar_estado(self):
+        """Recupera originales y nivel de una ejecución anterior que no llegó a revertir."""
+        try:
+            with open(_STATE_PATH, 'rb') as f:
+                datos = f.read()
+        except OSError:
+            datos = b''
+        
+        datos = datos[:len(datos) - len(datos) % _STATE_RECORD.size]
+        for idx, intval, texto in _STATE_RECORD.iter_unpack(datos):
+            if idx == _STATE_NIVEL:
+                self._last_applied_level = intval
+            elif idx < len(_TRACKED_KEYS):
+                self._original_settings.setdefault(
+                    _TRACKED_KEYS[idx], texto.rstrip(b'\0').decode() or str(intval))
+        
+        try:
+            os.makedirs(os.path.dirname(_STATE_PATH), exist_ok=True)
+            self._state_fd = os.open(_STATE_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        except OSError as e:
+            # Directorio no escribible: el estado queda solo en memoria
+            self.logger.debug(f"Estado de rollback no persistente: {e}")
+        
+        if self._original_settings:
+            self.logger.info(f"Recuperados {len(self._original_settings)} parámetros originales pendientes de revertir")
+    
+    def _persistir_registro(self, idx: int, intval: int, texto: str):
+        """Añade un registro al fichero de estado y lo sincroniza a disco."""
+        if self._state_fd is None:
+            return
+        try:
+            os.write(self._state_fd, _STATE_RECORD.pack(idx, intval, texto.encode()[:32]))
+            os.fsync(self._state_fd)
+        except OSError as e:
+            self.logger.debug(f"Error persistiendo estado de rollback: {e}")
+    
+    def _limpiar_estado(self):
+        """Vacía el fichero de estado tras un rollback completo."""
+        if self._state_fd is None:
+            return
+        try:
+            os.ftruncate(self._state_fd, 0)
+            os.fsync(self._state_fd)
+        except OSError as e:
+            self.logger.debug(f"Error limpiando estado de rollback: {e}")
+    
     def rollback_changes(self):
         """Revierte los cambios a su estado original."""
-        self.logger.info("Revirtiendo cambios del kernel a su estado original...")
-        for key, value in self._original_settings.items():
+        pendientes = {}
+        # Implementar para Windows si es necesario
+        if self._is_linux:
             try:
-                # Lógica para revertir. Depende de la plataforma.
-                if platform.system() == "Linux":
-                    subprocess.run(
-                        f"echo {value} | sudo tee /proc/sys/{key.replace('.', '/')}",
-                        shell=True, timeout=5, check=True
-                    )
-                # Implementar para Windows si es necesario
-                self.logger.info(f"Parámetro '{key}' revertido a '{value}'.")
+                # Un único `sysctl -w k1=v1 k2=v2 ...` para todo el lote
+                self._aplicar_sysctl(self._original_settings, guardar=False)
             except Exception as e:
-                self.logger.error(f"No se pudo revertir el parámetro '{key}': {e}")
+                self.logger.error(f"No se pudo ejecutar el rollback: {e}")
+            # Verificar releyendo: /proc/sys devuelve los vectores separados por tabs
+            for key, value in self._original_settings.items():
+                try:
+                    revertido = _leer_parametro(key).split() == value.split()
+                except OSError:
+                    revertido = False
+                if not revertido:
+                    pendientes[key] = value
+            
+            # Un único resumen en lugar de una línea de log por parámetro
+            total = len(self._original_settings)
+            if pendientes:
+                self.logger.error("Rollback: %d/%d parámetros sin revertir: %s",
+                                  len(pendientes), total, sorted(pendientes))
+            self.logger.info("Rollback completado: %d parámetros restaurados",
+                             total - len(pendientes))
         self.optimizaciones_aplicadas.clear()
+        self._last_applied_level = 0
+        # Solo se conservan (en memoria y en disco) los que no se revirtieron
+        self._limpiar_estado()
+        self._original_settings = {}
+        for key, value in pendientes.items():
+            self._save_original_setting(key, value)
 
-    def obtener_parametros_kernel_actuales(self) -> Dict:
-        """Obtiene parámetros actuales del kernel."""
+    def _leer_registro(self) -> Dict:
+        """Lee los valores de registro monitorizados, con caché de 60 s."""
+        ahora = time.monotonic()
+        if ahora - self._regcache['ts'] < 60.0:
+            return self._regcache['valores']
+        
+        winreg = self._winreg
+        valores = {}
+        rutas_registro = (
+            r'SYSTEM\CurrentControlSet\Control\Session Manager\Memory Management',
+            r'SYSTEM\CurrentControlSet\Services\Tcpip\Parameters',
+        )
+        acceso = winreg.KEY_READ | winreg.KEY_WOW64_64KEY
+        for path in rutas_registro:
+            try:
+                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path, 0, acceso) as key:
+                    for idx in range(winreg.QueryInfoKey(key)[1]):
+                        valor, datos, _ = winreg.EnumValue(key, idx)
+                        valores[valor] = datos
+            except OSError as e:
+                self.logger.debug(f"Error leyendo registro {path}: {e}")
+        
+        self._regcache = {'ts': ahora, 'valores': valores}
+        return valores
+    
+    def _aplicar_sysctl(self, ajustes: Dict[str, str], guardar: bool = True) -> List[str]:
+        """Aplica un lote sysctl; las claves de CFS ausentes se reintentan en debugfs."""
+        nuevos = []
+        if guardar:
+            nuevos = [key for key in ajustes if key not in self._original_settings]
+            for key in nuevos:
+                self._save_original_setting(key)
+        aplicados = _write_sysctl_many(ajustes)
+        for key in ajustes.keys() - set(aplicados):
+            ruta = _SCHED_DEBUGFS.get(key)
+            if ruta and os.path.exists(ruta):
+                try:
+                    _write_sysfs(ruta, ajustes[key])
+                    aplicados.append(key)
+                except Exception as e:
+                    self.logger.debug(f"Error escribiendo {ruta}: {e}")
+        # Un original solo tiene sentido si su clave llegó a escribirse
+        for key in set(nuevos) - set(aplicados):
+            self._original_settings.pop(key, None)
+        return aplicados
+    
+    def obtener_parametros_kernel_actuales(self, full: bool = False) -> Dict:
+        """
+        Obtiene parámetros actuales del kernel.
+        En Linux solo lee las claves que gestiona este módulo; `full=True`
+        vuelca todo `sysctl -a`.
+        """
         parametros = {'timestamp': __import__('datetime').datetime.now().isoformat()}
         
         try:
-            if platform.system() == "Windows":
+            if self._is_windows:
                 parametros['sistema_operativo'] = platform.platform()
                 parametros['version_kernel'] = platform.release()
                 
-                try:
-                    import winreg
-                    
-                    rutas_registro = [
-                        (winreg.HKEY_LOCAL_MACHINE, 
-                         r'SYSTEM\CurrentControlSet\Control\Session Manager\Memory Management'),
-                        (winreg.HKEY_LOCAL_MACHINE,
-                         r'SYSTEM\CurrentControlSet\Services\Tcpip\Parameters'),
-                    ]
-                    
-                    for base, path in rutas_registro:
-                        try:
-                            key = winreg.OpenKey(base, path)
-                            idx = 0
-                            while True:
-                                try:
-                                    valor, datos, tipo = winreg.EnumValue(key, idx)
-                                    parametros[valor] = datos
-                                    idx += 1
-                                except OSError:
-                                    break
-                            winreg.CloseKey(key)
-                        except:
-                            pass
-                
-                except:
-                    pass
+                parametros.update(self._leer_registro())
             
-            else:
+            elif full:
                 try:
                     output = subprocess.check_output(['sysctl', '-a'], 
                                                     universal_newlines=True,
@@ -105,6 +566,13 @@ class GestorKernel(BaseGestor):
                 except:
                     pass
             
+            else:
+                for clave in _TRACKED_KEYS:
+                    try:
+                        parametros[clave] = _read_sysctl(clave)
+                    except OSError:
+                        pass
+            
             self.parametros_kernel = parametros
             return parametros
         
@@ -115,23 +583,14 @@ class GestorKernel(BaseGestor):
     def optimizar_scheduler_kernel(self):
         """Optimiza scheduler del kernel."""
         try:
-            if platform.system() == "Linux":
-                ajustes = [
-                    ('kernel.sched_migration_cost_ns', '5000000'),
-                    ('kernel.sched_latency_ns', '10000000'),
-                    ('kernel.sched_min_granularity_ns', '2000000'),
-                    ('kernel.sched_wakeup_granularity_ns', '3000000'),
-                    ('kernel.sched_child_runs_first', '1')
-                ]
+            if self._is_linux:
+                ajustes = {
+                    'kernel.sched_migration_cost_ns': '5000000',
+                    **_ajustes_cfs(10000000),
+                    'kernel.sched_child_runs_first': '1',
+                }
                 
-                for param, valor in ajustes:
-                    try:
-                        subprocess.run(
-                            f"echo {valor} | sudo tee /proc/sys/{param.replace('.', '/')}",
-                            shell=True, timeout=5
-                        )
-                    except:
-                        pass
+                self._aplicar_sysctl(ajustes)
                 
                 self.registrar_evento(
                     "SCHEDULER_OPTIMIZADO",
@@ -142,23 +601,46 @@ class GestorKernel(BaseGestor):
         except Exception as e:
             self.logger.debug(f"Error optimizando scheduler: {e}")
     
+    def _scheduler_objetivo(self, disco: str, rotacional: bool) -> str:
+        """Scheduler adecuado a la clase de dispositivo: NVMe, SSD o HDD."""
+        if disco.startswith('nvme'):
+            return self.nvme_scheduler
+        return 'bfq' if rotacional else 'kyber'
+    
     def optimizar_io_scheduler(self):
-        """Optimiza I/O scheduler."""
+        """Optimiza I/O scheduler según la clase de cada dispositivo."""
         try:
-            if platform.system() == "Linux":
-                for disco in ['sda', 'nvme0n1']:
-                    ruta = f'/sys/block/{disco}/queue/scheduler'
-                    if os.path.exists(ruta):
-                        subprocess.run(
-                            f"echo mq-deadline | sudo tee {ruta}",
-                            shell=True, timeout=5
-                        )
+            if self._is_linux:
+                cambios = []
+                for disco in os.listdir('/sys/block'):
+                    # Solo dispositivos reales (loop, dm, zram... no tienen device/)
+                    if not os.path.exists(f'/sys/block/{disco}/device'):
+                        continue
+                    cola = f'/sys/block/{disco}/queue/'
+                    try:
+                        with open(cola + 'scheduler') as f:
+                            disponibles = f.read().split()
+                        with open(cola + 'rotational') as f:
+                            rotacional = f.read().strip() == '1'
+                    except OSError:
+                        continue
+                    
+                    objetivo = self._scheduler_objetivo(disco, rotacional)
+                    # El activo aparece entre corchetes: no reescribir si ya lo es
+                    if f'[{objetivo}]' in disponibles or objetivo not in disponibles:
+                        continue
+                    try:
+                        _write_sysfs(cola + 'scheduler', objetivo)
+                        cambios.append(f"{disco}={objetivo}")
+                    except Exception as e:
+                        self.logger.debug(f"Error cambiando scheduler de {disco}: {e}")
                 
-                self.registrar_evento(
-                    "IO_SCHEDULER_OPTIMIZADO",
-                    "Scheduler cambiado a mq-deadline",
-                    "INFO"
-                )
+                if cambios:
+                    self.registrar_evento(
+                        "IO_SCHEDULER_OPTIMIZADO",
+                        f"Scheduler cambiado: {', '.join(cambios)}",
+                        "INFO"
+                    )
         
         except Exception as e:
             self.logger.debug(f"Error optimizando I/O scheduler: {e}")
@@ -169,7 +651,7 @@ class GestorKernel(BaseGestor):
             if not self.cache_optimization:
                 return
             
-            if platform.system() == "Windows":
+            if self._is_windows:
                 try:
                     min_cache = 4 * 1024 * 1024
                     max_cache = 256 * 1024 * 1024
@@ -180,17 +662,16 @@ class GestorKernel(BaseGestor):
                         f"Min: {min_cache/(1024**2):.0f}MB, Max: {max_cache/(1024**2):.0f}MB",
                         "INFO"
                     )
-                    self.optimizaciones_aplicadas.append("cache_sistema")
+                    self.optimizaciones_aplicadas.add("cache_sistema")
                 except Exception as e:
                     self.logger.warning(f"Error optimizando caché: {e}")
             
             else:
                 try:
-                    os.system("echo 1 > /proc/sys/vm/drop_caches 2>/dev/null")
-                    os.system("sync")
+                    _drop_caches(1)
                     self.registrar_evento("CACHE_LINUX_OPTIMIZADO", "Caché limpiado", "INFO")
-                except:
-                    pass
+                except OSError as e:
+                    self.logger.debug(f"No se pudo limpiar caché: {e}")
         
         except Exception as e:
             self.registrar_evento("ERROR_CACHE", str(e), "WARNING")
@@ -200,15 +681,17 @@ class GestorKernel(BaseGestor):
         try:
             mem_antes = psutil.virtual_memory().used
             
-            if platform.system() == "Windows":
+            if self._is_windows:
                 try:
-                    proceso = ctypes.windll.kernel32.GetCurrentProcess()
-                    ctypes.windll.kernel32.SetProcessWorkingSetSize(proceso, -1, -1)
-                    
-                    subprocess.run(
-                        "rundll32.exe advapi32.dll,ProcessIdleTasks",
-                        shell=True, timeout=5, capture_output=True
-                    )
+                    if self._purga_memoria_disponible:
+                        # Vaciar working sets y la standby list de todo el sistema
+                        for comando in (_MEMORY_EMPTY_WORKING_SETS, _MEMORY_PURGE_STANDBY_LIST):
+                            status = _purgar_memoria_sistema(comando)
+                            if status != 0:
+                                self.logger.debug(f"NtSetSystemInformation({comando}): 0x{status & 0xFFFFFFFF:08X}")
+                    else:
+                        proceso = ctypes.windll.kernel32.GetCurrentProcess()
+                        ctypes.windll.kernel32.SetProcessWorkingSetSize(proceso, -1, -1)
                     
                     mem_despues = psutil.virtual_memory().used
                     liberada = mem_antes - mem_despues
@@ -219,18 +702,18 @@ class GestorKernel(BaseGestor):
                             f"Liberados: {liberada/(1024**2):.2f}MB",
                             "INFO"
                         )
-                        self.optimizaciones_aplicadas.append("memoria_virtual")
+                        self.optimizaciones_aplicadas.add("memoria_virtual")
                 
                 except Exception as e:
                     self.logger.warning(f"Error limpiando memoria virtual: {e}")
             
             else:
                 try:
-                    os.system("sync && echo 3 > /proc/sys/vm/drop_caches 2>/dev/null")
+                    _drop_caches(3)
                     self.registrar_evento("MEMORIA_VIRTUAL_LINUX_OPTIMIZADA", 
                                         "Caché y swap optimizados", "INFO")
-                except:
-                    pass
+                except OSError as e:
+                    self.logger.debug(f"No se pudo liberar caché: {e}")
         
         except Exception as e:
             self.registrar_evento("ERROR_MEMORIA_VIRTUAL", str(e), "WARNING")
@@ -241,7 +724,7 @@ class GestorKernel(BaseGestor):
             return
         
         try:
-            if platform.system() == "Windows":
+            if self._is_windows:
                 optimizaciones = []
                 
                 if self.nivel_agresividad >= 1:
@@ -277,12 +760,20 @@ class GestorKernel(BaseGestor):
                         "powercfg /change standby-timeout-ac 0",
                     ])
                 
-                for cmd in optimizaciones:
+                # bcdedit toca el almacén de arranque: solo lo que no esté ya aplicado
+                bcdedit = self._bcdedit_pendientes(
+                    [cmd for cmd in optimizaciones if cmd.startswith('bcdedit')])
+                comandos = [cmd for cmd in optimizaciones if not cmd.startswith('bcdedit')]
+                comandos.extend(bcdedit)
+                
+                if comandos:
+                    # Un solo cmd.exe para todo el lote en vez de uno por comando
                     try:
-                        subprocess.run(cmd, shell=True, timeout=5, capture_output=True)
-                        self.optimizaciones_aplicadas.append(cmd.split()[0])
+                        subprocess.run(["cmd", "/c", " & ".join(comandos)],
+                                       timeout=30, capture_output=True)
+                        self.optimizaciones_aplicadas.update(cmd.split()[0] for cmd in comandos)
                     except Exception as e:
-                        self.logger.debug(f"Error aplicando {cmd}: {e}")
+                        self.logger.debug(f"Error aplicando optimizaciones: {e}")
                 
                 self.registrar_evento(
                     "MODO_AGRESIVO_ACTIVADO",
@@ -294,44 +785,28 @@ class GestorKernel(BaseGestor):
             else:
                 optimizaciones = []
                 
-                ajustes_sysctl = {
-                    1: {
-                        'vm.swappiness': '10',
-                        'vm.dirty_ratio': '20',
-                    },
-                    2: {
-                        'vm.swappiness': '5',
-                        'vm.dirty_ratio': '15',
-                        'vm.dirty_background_ratio': '5',
-                    },
-                    3: {
-                        'vm.swappiness': '1',
-                        'vm.dirty_ratio': '10',
-                        'vm.dirty_background_ratio': '2',
-                        'net.ipv4.tcp_tw_reuse': '1',
-                    },
-                    4: {
-                        'vm.swappiness': '0',
-                        'kernel.sched_migration_cost_ns': '5000000',
-                        'net.ipv4.tcp_fin_timeout': '10',
-                    },
-                    5: {
-                        'kernel.sched_latency_ns': '5000000',
-                        'kernel.sched_min_granularity_ns': '1000000',
-                        'net.core.somaxconn': '65535',
-                    }
-                }
+                nivel_actual = self.nivel_agresividad
+                if nivel_actual > self._last_applied_level:
+                    # Solo el delta (último aplicado, actual]
+                    desde = self._last_applied_level
+                elif nivel_actual < self._last_applied_level:
+                    # Al bajar de nivel se reaplica una vez desde la base
+                    desde = 0
+                else:
+                    return
                 
-                for nivel in range(1, self.nivel_agresividad + 1):
-                    for param, valor in ajustes_sysctl.get(nivel, {}).items():
-                        try:
-                            subprocess.run(
-                                f"echo {valor} | sudo tee /proc/sys/{param.replace('.', '/')}",
-                                shell=True, timeout=5
-                            )
-                            optimizaciones.append(param)
-                        except:
-                            pass
+                # Fusionar niveles: los superiores pisan a los inferiores y cada
+                # clave se escribe una sola vez
+                ajustes = {}
+                for nivel in _SYSCTL_LEVELS[desde:nivel_actual]:
+                    ajustes.update(nivel)
+                try:
+                    optimizaciones = self._aplicar_sysctl(ajustes)
+                    if optimizaciones:
+                        self._last_applied_level = nivel_actual
+                        self._persistir_registro(_STATE_NIVEL, nivel_actual, '')
+                except Exception as e:
+                    self.logger.debug(f"Error aplicando sysctl: {e}")
                 
                 if optimizaciones:
                     self.registrar_evento(
@@ -343,18 +818,42 @@ class GestorKernel(BaseGestor):
         except Exception as e:
             self.registrar_evento("ERROR_MODO_AGRESIVO", str(e), "WARNING")
     
+    def _bcdedit_pendientes(self, comandos: List[str]) -> List[str]:
+        """Filtra los `bcdedit /set` cuyo valor ya figura en `bcdedit /enum {current}`."""
+        if not comandos:
+            return []
+        try:
+            salida = subprocess.run(["bcdedit", "/enum", "{current}"], timeout=10,
+                                    capture_output=True, text=True).stdout
+        except Exception:
+            return comandos
+        
+        actuales = {}
+        for linea in salida.splitlines():
+            partes = linea.split(None, 1)
+            if len(partes) == 2:
+                actuales[partes[0].lower()] = partes[1].strip().lower()
+        
+        pendientes = []
+        for cmd in comandos:
+            _, _, opcion, valor = cmd.split(None, 3)
+            valor = {'true': 'yes', 'false': 'no'}.get(valor.lower(), valor.lower())
+            if actuales.get(opcion.lower()) != valor:
+                pendientes.append(cmd)
+        return pendientes
+    
     def optimizar_pagefile(self):
         """Optimiza archivo de paginación."""
         if not self.pagefile_tuning:
             return
         
         try:
-            if platform.system() == "Windows":
+            if self._is_windows:
                 mem_total = psutil.virtual_memory().total
                 tamano_recomendado = int(mem_total * 1.5 / (1024**3))
                 
                 try:
-                    import winreg
+                    winreg = self._winreg
                     key = winreg.OpenKey(
                         winreg.HKEY_LOCAL_MACHINE,
                         r'SYSTEM\CurrentControlSet\Control\Session Manager\Memory Management',
@@ -371,7 +870,7 @@ class GestorKernel(BaseGestor):
                         f"Tamaño: {tamano_recomendado}GB",
                         "INFO"
                     )
-                    self.optimizaciones_aplicadas.append("pagefile")
+                    self.optimizaciones_aplicadas.add("pagefile")
                 
                 except:
                     pass
@@ -382,24 +881,20 @@ class GestorKernel(BaseGestor):
     def optimizar_red_kernel(self):
         """Optimiza parámetros de red a nivel kernel."""
         try:
-            if platform.system() == "Linux":
-                ajustes = [
-                    ('net.core.netdev_max_backlog', '5000'),
-                    ('net.core.rmem_max', '16777216'),
-                    ('net.core.wmem_max', '16777216'),
-                    ('net.ipv4.tcp_rmem', '4096 87380 16777216'),
-                    ('net.ipv4.tcp_wmem', '4096 65536 16777216'),
-                    ('net.ipv4.tcp_congestion_control', 'bbr')
-                ]
+            if self._is_linux:
+                ajustes = {
+                    'net.core.netdev_max_backlog': '5000',
+                    'net.core.rmem_max': '16777216',
+                    'net.core.wmem_max': '16777216',
+                    'net.ipv4.tcp_rmem': '4096 87380 16777216',
+                    'net.ipv4.tcp_wmem': '4096 65536 16777216',
+                }
+                if self._bbr_available:
+                    # BBR depende del pacing de fq
+                    ajustes['net.core.default_qdisc'] = 'fq'
+                    ajustes['net.ipv4.tcp_congestion_control'] = 'bbr'
                 
-                for param, valor in ajustes:
-                    try:
-                        subprocess.run(
-                            f"echo {valor} | sudo tee /proc/sys/{param.replace('.', '/')}",
-                            shell=True, timeout=5
-                        )
-                    except:
-                        pass
+                self._aplicar_sysctl(ajustes)
                 
                 self.registrar_evento(
                     "RED_KERNEL_OPTIMIZADA",
@@ -410,18 +905,49 @@ class GestorKernel(BaseGestor):
         except Exception as e:
             self.logger.debug(f"Error optimizando red kernel: {e}")
     
+    def _snapshot(self) -> Dict:
+        """Retorna CPU/memoria recientes, refrescando como mucho cada 5 s."""
+        cache = self._metrics_cache
+        ahora = time.monotonic()
+        if cache["mem"] is None or ahora - cache["ts"] >= 5.0:
+            if self._is_linux:
+                cache["cpu"] = self._cpu_percent_nb()
+                cache["mem"] = _mem_percent()
+            else:
+                cache["cpu"] = psutil.cpu_percent(interval=None)
+                cache["mem"] = psutil.virtual_memory().percent
+            cache["ts"] = ahora
+        return cache
+    
+    def _cpu_percent_nb(self) -> float:
+        """Uso de CPU desde la llamada anterior leyendo /proc/stat (no bloquea)."""
+        with open('/proc/stat') as f:
+            campos = f.readline().split()
+        # user nice system idle iowait irq softirq steal (guest ya va en user)
+        valores = [float(v) for v in campos[1:9]]
+        idle = valores[3] + valores[4]
+        total = sum(valores)
+        delta_total = total - self._prev_total
+        delta_idle = idle - self._prev_idle
+        self._prev_idle = idle
+        self._prev_total = total
+        if delta_total <= 0:
+            return 0.0
+        return (delta_total - delta_idle) / delta_total * 100
+    
     def recuperacion_bajo_estres(self):
         """Recuperación automática bajo estrés extremo."""
         try:
-            mem = psutil.virtual_memory()
-            cpu_pct = psutil.cpu_percent(interval=0.5)
+            snapshot = self._snapshot()
+            mem_pct = snapshot["mem"]
+            cpu_pct = snapshot["cpu"]
             
-            if mem.percent > 92 or cpu_pct > 97:
+            if mem_pct > 92 or cpu_pct > 97:
                 self.recuperaciones_realizadas += 1
                 
                 self.registrar_evento(
                     "RECUPERACION_BAJO_ESTRES",
-                    f"CPU: {cpu_pct:.1f}%, MEM: {mem.percent:.1f}%",
+                    f"CPU: {cpu_pct:.1f}%, MEM: {mem_pct:.1f}%",
                     "WARNING",
                     prioridad=9
                 )
@@ -429,7 +955,7 @@ class GestorKernel(BaseGestor):
                 self.limpiar_memoria_virtual()
                 self.optimizar_cache_sistema()
                 
-                if mem.percent > 95:
+                if mem_pct > 95:
                     nivel_anterior = self.nivel_agresividad
                     self.nivel_agresividad = 5
                     self.modo_agresivo = True
@@ -445,10 +971,11 @@ class GestorKernel(BaseGestor):
             return
         
         try:
-            cpu = psutil.cpu_percent(interval=0.1)
-            mem = psutil.virtual_memory()
+            snapshot = self._snapshot()
+            cpu = snapshot["cpu"]
+            mem_pct = snapshot["mem"]
             
-            carga_total = (cpu * 0.6 + mem.percent * 0.4)
+            carga_total = (cpu * 0.6 + mem_pct * 0.4)
             
             if carga_total > 85:
                 nuevo_nivel = min(5, self.nivel_agresividad + 1)
@@ -487,17 +1014,17 @@ class GestorKernel(BaseGestor):
             'estadisticas': {
                 'optimizaciones_aplicadas': len(self.optimizaciones_aplicadas),
                 'recuperaciones': self.recuperaciones_realizadas,
-                'optimizaciones_lista': list(set(self.optimizaciones_aplicadas))
+                'optimizaciones_lista': list(self.optimizaciones_aplicadas)
             }
         }
     
     def optimizar_registro_windows(self):
         """Aplica optimizaciones seguras al Registro de Windows."""
-        if platform.system() != "Windows":
+        if not self._is_windows:
             return
         
         try:
-            import winreg
+            winreg = self._winreg
             optimizaciones = {
                 r'SYSTEM\CurrentControlSet\Control\FileSystem': [
                     ("NtfsDisableLastAccessUpdate", 1, winreg.REG_DWORD),
@@ -520,6 +1047,17 @@ class GestorKernel(BaseGestor):
         except Exception as e:
             self.logger.error(f"Error al optimizar el registro: {e}")
 
+    def detener(self):
+        """Detiene el gestor y cierra el fichero de estado y los descriptores de /proc/sys."""
+        super().detener()
+        _cerrar_sysctl_fds()
+        if self._state_fd is not None:
+            try:
+                os.close(self._state_fd)
+            except OSError:
+                pass
+            self._state_fd = None
+    
     def setup_tasks(self):
         """Configura y añade las tareas de optimización del kernel al scheduler."""
         scheduler.add_task(Task("optimizar_registro_windows", self.optimizar_registro_windows, timedelta(days=7)))
@@ -532,4 +1070,15 @@ class GestorKernel(BaseGestor):
         scheduler.add_task(Task("optimizar_io_scheduler", self.optimizar_io_scheduler, timedelta(minutes=10)))
         scheduler.add_task(Task("optimizar_red_kernel", self.optimizar_red_kernel, timedelta(minutes=15)))
         scheduler.add_task(Task("recuperacion_bajo_estres", self.recuperacion_bajo_estres, timedelta(seconds=30)))
-        scheduler.add_task(Task("auto_tune_dinamico", self.auto_tune_dinamico, timedelta(seconds=30)))
\ No newline at end of file
+        scheduler.add_task(Task("auto_tune_dinamico", self.auto_tune_dinamico, timedelta(seconds=30)))
+
+
+# Los métodos de la otra plataforma se sustituyen por no-ops al importar: la
+# tarea programada queda en una llamada vacía
+if not _IS_WINDOWS:
+    GestorKernel.optimizar_registro_windows = lambda self: None
+    GestorKernel.optimizar_pagefile = lambda self: None
+if not _IS_LINUX:
+    GestorKernel.optimizar_scheduler_kernel = lambda self: None
+    GestorKernel.optimizar_io_scheduler = lambda self: None
+    GestorKernel.optimizar_red_kernel = lambda self: None
@@ -4,18 +4,217 @@ Gestor avanzado de memoria con algoritmos adaptativos, predicción y optimizaci
 Incluye gestión de prioridades de memoria, compresión dinámica y análisis predictivo.
 """
 from base_gestor_Version2 import BaseGestor, Task
-from memory_utils import cached, LRUCache
+from memory_utils import LRUCache
+from core_events import EV_MEMORIA_CRITICA
 import psutil
 import ctypes
 import gc
+import heapq
 import os
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, List, Optional, Any, Set, Tuple
 import threading
 import numpy as np
-from collections import deque
 import platform
-from statsmodels.tsa.arima.model import ARIMA
-from datetime import timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from datetime import datetime, timedelta
+
+try:
+    import wmi
+    HAS_WMI = True
+except ImportError:
+    HAS_WMI = False
+
+# Actualizaciones incrementales del modelo antes de un reajuste completo
+_ARIMA_REFIT_CADA = 20
+
+# Procesos del sistema cuya memoria y prioridad se protegen siempre
+_NOMBRES_CRITICOS = frozenset({'explorer.exe', 'svchost.exe', 'csrss.exe', 'dwm.exe'})
+
+# Procesos que pueden terminarse si consumen demasiada memoria (nivel 4)
+_NOMBRES_PRESCINDIBLES = frozenset({
+    'chrome.exe', 'firefox.exe', 'slack.exe', 'teams.exe',
+    'java.exe', 'python.exe', 'node.exe'
+})
+
+# Objetivos de la limpieza agresiva (nivel 5); peligrosa, debería ser configurable
+_NOMBRES_AGRESIVO = frozenset({'chrome.exe', 'firefox.exe', 'Spotify.exe', 'Code.exe'})
+
+# Pendiente mínima (% por muestra) para consultar el forecast ARIMA
+_PENDIENTE_MINIMA = 0.1
+
+_ES_WINDOWS = platform.system() == "Windows"
+_ES_LINUX = platform.system() == "Linux"
+
+_PROCESS_ALL_ACCESS = 0x1F0FFF
+
+# Barrido de EmptyWorkingSet: por debajo de este número de candidatos no compensa el pool
+_MIN_CANDIDATOS_PARALELO = 16
+_WORKERS_WORKING_SET = 8
+
+# Funciones Win32 resueltas una sola vez, con tipos explícitos para que los
+# HANDLE no se trunquen a c_int en 64 bits
+if _ES_WINDOWS:
+    from ctypes import wintypes
+    
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _psapi = ctypes.WinDLL("psapi", use_last_error=True)
+    
+    _OpenProcess = _kernel32.OpenProcess
+    _OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _OpenProcess.restype = wintypes.HANDLE
+    
+    _CloseHandle = _kernel32.CloseHandle
+    _CloseHandle.argtypes = [wintypes.HANDLE]
+    _CloseHandle.restype = wintypes.BOOL
+    
+    _EmptyWorkingSet = _psapi.EmptyWorkingSet
+    _EmptyWorkingSet.argtypes = [wintypes.HANDLE]
+    _EmptyWorkingSet.restype = wintypes.BOOL
+    
+    _SetProcessWorkingSetSize = _kernel32.SetProcessWorkingSetSize
+    _SetProcessWorkingSetSize.argtypes = [wintypes.HANDLE, ctypes.c_size_t, ctypes.c_size_t]
+    _SetProcessWorkingSetSize.restype = wintypes.BOOL
+
+
+@contextmanager
+def _open_process(pid: int, acceso: int = _PROCESS_ALL_ACCESS):
+    """Abre un HANDLE de proceso y garantiza su cierre aunque falle la operación."""
+    handle = _OpenProcess(acceso, False, pid)
+    try:
+        yield handle
+    finally:
+        if handle:
+            _CloseHandle(handle)
+
+
+# NtQuerySystemInformation(SystemProcessInformation) devuelve todos los procesos
+# en una sola llamada al kernel
+_SYSTEM_PROCESS_INFORMATION_CLASS = 5
+_STATUS_INFO_LENGTH_MISMATCH = 0xC0000004
+
+
+class _SYSTEM_PROCESS_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ('NextEntryOffset', ctypes.c_uint32),
+        ('NumberOfThreads', ctypes.c_uint32),
+        ('WorkingSetPrivateSize', ctypes.c_longlong),
+        ('HardFaultCount', ctypes.c_uint32),
+        ('NumberOfThreadsHighWatermark', ctypes.c_uint32),
+        ('CycleTime', ctypes.c_ulonglong),
+        ('CreateTime', ctypes.c_longlong),
+        ('UserTime', ctypes.c_longlong),
+        ('KernelTime', ctypes.c_longlong),
+        ('ImageNameLength', ctypes.c_ushort),
+        ('ImageNameMaximumLength', ctypes.c_ushort),
+        ('ImageNameBuffer', ctypes.c_void_p),
+        ('BasePriority', ctypes.c_int32),
+        ('UniqueProcessId', ctypes.c_void_p),
+        ('InheritedFromUniqueProcessId', ctypes.c_void_p),
+        ('HandleCount', ctypes.c_uint32),
+        ('SessionId', ctypes.c_uint32),
+        ('UniqueProcessKey', ctypes.c_void_p),
+        ('PeakVirtualSize', ctypes.c_size_t),
+        ('VirtualSize', ctypes.c_size_t),
+        ('PageFaultCount', ctypes.c_uint32),
+        ('PeakWorkingSetSize', ctypes.c_size_t),
+        ('WorkingSetSize', ctypes.c_size_t),
+    ]
+
+
+def _memoria_no_contable(total: int, disponible: int, usado: int, buffers: int, cached: int,
+                         linux: bool = _ES_LINUX) -> int:
+    """Memoria que no está ni disponible ni en uso real.
+    
+    En Linux psutil ya excluye buffers/caché de `usado`, así que basta con
+    total - disponible - usado; en el resto de plataformas se descuentan de `usado`.
+    Se opera en int64 y el resultado se acota a 0.
+    """
+    vals = np.array((total, disponible, usado, buffers, cached), dtype=np.int64)
+    if linux:
+        return max(int(vals[0] - vals[1] - vals[2]), 0)
+    return max(int(vals[0] - vals[1] - (vals[2] - vals[3] - vals[4])), 0)
+
+
+class _MemInfoReader:
+    """Lector de /proc/meminfo sobre un fd persistente: cada muestra es un único pread."""
+    
+    _CAMPOS = frozenset({
+        b'MemTotal', b'MemFree', b'MemAvailable', b'Buffers', b'Cached',
+        b'SReclaimable', b'SwapTotal', b'SwapFree'
+    })
+    
+    def __init__(self) -> None:
+        self.fd = os.open('/proc/meminfo', os.O_RDONLY)
+    
+    def leer(self) -> Dict[str, int]:
+        """Campos relevantes de /proc/meminfo en bytes."""
+        valores = {}
+        for linea in os.pread(self.fd, 8192, 0).splitlines():
+            clave, _, resto = linea.partition(b':')
+            if clave in self._CAMPOS:
+                valores[clave.decode()] = int(resto.split()[0]) * 1024
+        return valores
+    
+    def usado(self) -> int:
+        """Memoria no disponible: MemTotal - MemAvailable."""
+        v = self.leer()
+        return v['MemTotal'] - v.get('MemAvailable', v['MemFree'])
+    
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+    
+    def __del__(self) -> None:
+        self.close()
+
+
+class _RingBuffer:
+    """Buffer circular float32 preasignado; `total` cuenta todas las muestras añadidas.
+    
+    El monitor escribe y el hilo del scheduler lee: ambos lados toman `_buf_lock`,
+    y la sección crítica de la lectura es una copia contigua de como mucho `n` floats.
+    """
+    
+    __slots__ = ('buf', 'head', 'count', 'total', '_buf_lock')
+    
+    def __init__(self, n: int) -> None:
+        self.buf = np.empty(n, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self._buf_lock = threading.Lock()
+    
+    def append(self, x: float) -> None:
+        with self._buf_lock:
+            self.buf[self.head] = x
+            self.head = (self.head + 1) % len(self.buf)
+            if self.count < len(self.buf):
+                self.count += 1
+            self.total += 1
+    
+    def snapshot(self) -> np.ndarray:
+        """Copia de las muestras en orden cronológico (de la más antigua a la más reciente)."""
+        with self._buf_lock:
+            out = np.empty(self.count, dtype=np.float32)
+            if self.count < len(self.buf):
+                np.copyto(out, self.buf[:self.count])
+            else:
+                # Dos memcpy: cola [head:] seguida de cabeza [:head]
+                cola = len(self.buf) - self.head
+                np.copyto(out[:cola], self.buf[self.head:])
+                np.copyto(out[cola:], self.buf[:self.head])
+            return out
+    
+    def last(self) -> float:
+        with self._buf_lock:
+            return float(self.buf[self.head - 1])
+    
+    def __len__(self) -> int:
+        return self.count
 
 class GestorMemoria(BaseGestor):
     def __init__(self) -> None:
@@ -29,36 +228,73 @@ class GestorMemoria(BaseGestor):
         self.intentos_liberacion: int = 0
         self.liberaciones_exitosas: int = 0
         self.memoria_liberada_total: int = 0
-        self.historial_uso: deque = deque(maxlen=500)
+        self.historial_uso = _RingBuffer(500)
         self.procesos_monitoreados: Dict[int, Dict[str, Any]] = {}
         
         # Nuevas características de prioridad de memoria
         self.mapa_prioridades_memoria: Dict[int, Dict[str, Any]] = {}
         self.procesos_criticos_memoria: Set[int] = set()
-        self.historial_swap: deque = deque(maxlen=200)
-        self.compresion_activa: bool = False
+        self.historial_swap = _RingBuffer(200)
+        # Persistido en la configuración: la compresión solo se activa una vez por equipo
+        self.compresion_activa: bool = self.config.memoria.compresion_aplicada
         
         # Modelo predictivo
         self.modelo_predictivo = None
+        self._muestras_modelo: int = 0
+        self._appends_modelo: int = 0
         
         # Caché para estadísticas
         self._stats_cache = LRUCache(max_size=100, default_ttl=5.0)
+        # Cachés por instancia (timestamp monotónico, valor): sin claves globales ligadas a self
+        self._tendencia_cache: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+        self._procesos_cache: Tuple[float, Optional[List[Dict[str, Any]]]] = (0.0, None)
+        
+        # Handles psutil reutilizados entre ciclos: pid -> (create_time, Process)
+        self._proc_handles: Dict[int, Tuple[float, psutil.Process]] = {}
+        self._proceso_actual = psutil.Process()
+        self._nt_buffer = bytearray(512 * 1024)
+        self._meminfo = _MemInfoReader() if _ES_LINUX else None
+        
+        # Acciones de limpieza acumulativas: el nivel N ejecuta las N primeras
+        self._cleanup_levels = (
+            self._limpieza_nivel_1,
+            self._limpieza_nivel_2,
+            self._limpieza_nivel_3,
+            self._limpieza_nivel_4,
+            self._limpieza_nivel_5,
+        )
         
         self.logger.info("GestorMemoria inicializado")
     
-    @cached(ttl=5.0)
+    def _memoria_usada(self) -> int:
+        """Bytes no disponibles (total - disponible); en Linux sin abrir /proc/meminfo."""
+        if self._meminfo is not None:
+            return self._meminfo.usado()
+        mem = psutil.virtual_memory()
+        return mem.total - mem.available
+    
+    def porcentaje_memoria(self) -> float:
+        """Porcentaje de memoria física no disponible, con una sola lectura."""
+        if self._meminfo is not None:
+            v = self._meminfo.leer()
+            return (v['MemTotal'] - v.get('MemAvailable', v['MemFree'])) / v['MemTotal'] * 100
+        return psutil.virtual_memory().percent
+    
+    def _read_mem_raw(self) -> Tuple[Any, Any]:
+        """Lectura sin caché de memoria física y swap."""
+        return psutil.virtual_memory(), psutil.swap_memory()
+    
     def obtener_uso_memoria_detallado(self) -> Dict[str, Any]:
         """Obtiene estadísticas completas de memoria."""
         try:
-            mem = psutil.virtual_memory()
-            swap = psutil.swap_memory()
+            mem, swap = self._read_mem_raw()
             
             # Memoria del proceso actual
-            proceso_actual = psutil.Process()
+            proceso_actual = self._proceso_actual
             mem_info = proceso_actual.memory_info()
             
             estadisticas = {
-                'timestamp': __import__('datetime').datetime.now().isoformat(),
+                'timestamp': datetime.now().isoformat(),
                 'memoria_fisica': {
                     'total': mem.total,
                     'disponible': mem.available,
@@ -84,11 +320,6 @@ class GestorMemoria(BaseGestor):
                 }
             }
             
-            self.historial_uso.append(mem.percent)
-            self.historial_swap.append(swap.percent)
-            self.metricas.registrar('memoria_porcentaje', mem.percent, 
-                                   tags={'swap': swap.percent})
-            
             return estadisticas
         
         except Exception as e:
@@ -101,47 +332,115 @@ class GestorMemoria(BaseGestor):
             return
         
         try:
-            # Modelo ARIMA
-            self.modelo_predictivo = ARIMA(list(self.historial_uso), order=(5,1,0)).fit()
+            nuevas = self.historial_uso.total - self._muestras_modelo
+            if nuevas == 0 and self.modelo_predictivo is not None:
+                return
+            
+            if (self.modelo_predictivo is not None
+                    and self._appends_modelo < _ARIMA_REFIT_CADA
+                    and nuevas <= len(self.historial_uso)):
+                # Filtrar solo las muestras nuevas con los parámetros ya estimados
+                nuevos_valores = self.historial_uso.snapshot()[-nuevas:].astype(np.float64)
+                self.modelo_predictivo = self.modelo_predictivo.append(nuevos_valores, refit=False)
+                self._appends_modelo += 1
+            else:
+                # ARIMA(5,1,0) en espacio de estados; low_memory descarta el suavizado,
+                # que no se usa (el forecast sigue disponible)
+                self.modelo_predictivo = SARIMAX(
+                    self.historial_uso.snapshot().astype(np.float64), order=(5, 1, 0),
+                    enforce_stationarity=False
+                ).fit(disp=False, low_memory=True)
+                self._appends_modelo = 0
+            
+            self._muestras_modelo = self.historial_uso.total
         except Exception as e:
             self.logger.error(f"Error entrenando modelo predictivo: {e}")
             self.modelo_predictivo = None
 
-    @cached(ttl=10.0)
+    def _fast_trend(self, window: int = 30) -> float:
+        """Pendiente por mínimos cuadrados de las últimas `window` muestras."""
+        y = self.historial_uso.snapshot()[-window:]
+        n = len(y)
+        if n < 2:
+            return 0.0
+        x = np.arange(n, dtype=np.float32)
+        x -= x.mean()
+        return float(np.dot(x, y - y.mean()) / np.dot(x, x))
+    
     def analizar_tendencia_memoria(self) -> Dict[str, Any]:
-        """Analiza tendencia de uso de memoria."""
+        """Analiza tendencia de uso de memoria (caché por instancia de 10 s)."""
+        ts, valor = self._tendencia_cache
+        ahora = time.monotonic()
+        if valor is not None and ahora - ts < 10.0:
+            return valor
+        valor = self._calcular_tendencia_memoria()
+        self._tendencia_cache = (ahora, valor)
+        return valor
+    
+    def _calcular_tendencia_memoria(self) -> Dict[str, Any]:
         if not self.modelo_predictivo:
             return {'tendencia': 'sin_datos'}
         
         try:
             predicciones = self.modelo_predictivo.forecast(steps=5)
+            ultimo = self.historial_uso.last()
             return {
-                'tendencia': 'subiendo' if predicciones[-1] > self.historial_uso[-1] else 'bajando',
-                'tasa_cambio': float(predicciones[0] - self.historial_uso[-1]),
+                'tendencia': 'subiendo' if predicciones[-1] > ultimo else 'bajando',
+                'tasa_cambio': float(predicciones[0] - ultimo),
                 'prediccion_proximo_intervalo': float(predicciones[0]),
                 'prediccion_5_intervalos': float(predicciones[-1]),
-                'promedio_ultimos_30': float(np.mean(list(self.historial_uso)[-30:]))
+                'promedio_ultimos_30': float(self.historial_uso.snapshot()[-30:].mean())
             }
         except Exception as e:
             self.logger.error(f"Error en predicción de memoria: {e}")
             return {'tendencia': 'sin_datos'}
 
+    def _get_proc(self, pid: int) -> psutil.Process:
+        """Retorna un handle cacheado del proceso; se recrea si el PID fue reutilizado."""
+        entrada = self._proc_handles.get(pid)
+        if entrada is not None:
+            # is_running() compara el create_time guardado con el actual
+            if entrada[1].is_running():
+                return entrada[1]
+            del self._proc_handles[pid]
+        
+        proc = psutil.Process(pid)
+        self._proc_handles[pid] = (proc.create_time(), proc)
+        return proc
+    
+    def _purgar_proc_handles(self) -> None:
+        """Descarta handles de procesos que ya no existen."""
+        vivos = set(psutil.pids())
+        for pid in [pid for pid in self._proc_handles if pid not in vivos]:
+            del self._proc_handles[pid]
+    
+    def _ajustar_working_set(self, pid: int, minimo: int, maximo: int) -> bool:
+        """SetProcessWorkingSetSize sobre un handle real del proceso (-1, -1 recorta)."""
+        with _open_process(pid) as handle:
+            return bool(handle) and bool(_SetProcessWorkingSetSize(handle, minimo, maximo))
+    
+    def _vaciar_working_set(self, pid: int) -> bool:
+        """Vacía el working set de un proceso con EmptyWorkingSet."""
+        with _open_process(pid) as handle:
+            return bool(handle) and bool(_EmptyWorkingSet(handle))
+    
     def ajustar_prioridad_memoria_proceso(self, proc: psutil.Process, prioridad: int) -> bool:
         """Ajusta prioridad de memoria de un proceso específico (1-10)."""
         try:
             pid = proc.pid
-            nombre = proc.name()
+            # name() y memory_info() comparten una sola consulta al kernel
+            with proc.oneshot():
+                nombre = proc.name()
+                rss = proc.memory_info().rss
             
             # Mapear prioridad a working set
             if prioridad >= 8:
                 # Alta prioridad - proteger memoria
                 try:
                     if platform.system() == "Windows":
-                        min_ws = proc.memory_info().rss
+                        min_ws = rss
                         max_ws = int(min_ws * 1.5)
-                        ctypes.windll.kernel32.SetProcessWorkingSetSize(
-                            proc.pid, min_ws, max_ws
-                        )
+                        self._ajustar_working_set(pid, min_ws, max_ws)
                 except:
                     pass
             
@@ -149,16 +448,15 @@ class GestorMemoria(BaseGestor):
                 # Baja prioridad - permitir paginación agresiva
                 try:
                     if platform.system() == "Windows":
-                        ctypes.windll.kernel32.SetProcessWorkingSetSize(
-                            proc.pid, -1, -1
-                        )
+                        self._ajustar_working_set(pid, -1, -1)
                 except:
                     pass
             
             self.mapa_prioridades_memoria[pid] = {
                 'nombre': nombre,
                 'prioridad': prioridad,
-                'timestamp': __import__('datetime').datetime.now()
+                # Marca monotónica en ns: solo se usa para ordenar/caducar entradas
+                'timestamp': time.monotonic_ns()
             }
             
             return True
@@ -172,22 +470,17 @@ class GestorMemoria(BaseGestor):
         try:
             procesos_pesados = self.obtener_procesos_pesados(limite=20)
             
-            for proc_info in procesos_pesados:
+            # Prioridad por umbral de memoria para todo el lote:
+            # >20% -> 2 (consumidor excesivo), >10% -> 5 (normal), resto -> 7 (alto)
+            memoria_pct = np.fromiter((p['memoria_pct'] for p in procesos_pesados),
+                                      dtype=np.float32, count=len(procesos_pesados))
+            prioridades = np.select([memoria_pct > 20, memoria_pct > 10], [2, 5], default=7)
+            
+            for proc_info, prioridad in zip(procesos_pesados, prioridades.tolist()):
                 try:
-                    proc = psutil.Process(proc_info['pid'])
-                    nombre = proc_info['nombre']
-                    memoria_pct = proc_info['memoria_pct']
-                    
-                    # Determinar prioridad
-                    if nombre in ['explorer.exe', 'dwm.exe', 'svchost.exe']:
+                    if proc_info['nombre'] in _NOMBRES_CRITICOS:
                         prioridad = 9  # Crítico
-                    elif memoria_pct > 20:
-                        prioridad = 2  # Bajo - consumidor excesivo
-                    elif memoria_pct > 10:
-                        prioridad = 5  # Normal
-                    else:
-                        prioridad = 7  # Alto
-                    
+                    proc = self._get_proc(proc_info['pid'])
                     self.ajustar_prioridad_memoria_proceso(proc, prioridad)
                 
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
@@ -204,22 +497,28 @@ class GestorMemoria(BaseGestor):
     
     def activar_compresion_memoria(self) -> None:
         """Activa compresión de memoria en Windows 10+."""
-        if platform.system() != "Windows":
+        if not _ES_WINDOWS or self.compresion_activa:
             return
         
         try:
-            import subprocess
-            
-            # Habilitar compresión de memoria
-            resultado = subprocess.run(
-                ['powershell', '-Command', 
-                 'Enable-MMAgent -MemoryCompression'],
-                capture_output=True,
-                timeout=10
-            )
+            if HAS_WMI:
+                # Lo mismo que Enable-MMAgent, sin levantar un runtime de PowerShell
+                mmagent = wmi.WMI(namespace=r"root\Microsoft\Windows\MMAgent").MSFT_MMAgent
+                mmagent.Enable(MemoryCompression=True)
+                activada = True
+            else:
+                import subprocess
+                resultado = subprocess.run(
+                    ['powershell', '-Command', 
+                     'Enable-MMAgent -MemoryCompression'],
+                    capture_output=True,
+                    timeout=10
+                )
+                activada = resultado.returncode == 0
             
-            if resultado.returncode == 0:
+            if activada:
                 self.compresion_activa = True
+                self.config.set('memoria.compresion_aplicada', True)
                 self.registrar_evento(
                     "COMPRESION_MEMORIA_ACTIVADA",
                     "Compresión de memoria habilitada",
@@ -229,17 +528,17 @@ class GestorMemoria(BaseGestor):
         except Exception as e:
             self.logger.debug(f"Error activando compresión: {e}")
     
-    def optimizar_pagefile_dinamico(self) -> None:
+    def optimizar_pagefile_dinamico(self, stats: Optional[Dict[str, Any]] = None) -> None:
         """Optimiza archivo de paginación dinámicamente."""
         try:
-            mem = psutil.virtual_memory()
-            swap = psutil.swap_memory()
+            # Reutiliza las estadísticas del tick si se pasan
+            swap_pct = stats['swap']['porcentaje'] if stats else psutil.swap_memory().percent
             
             # Si swap está muy usado, aumentar tamaño
-            if swap.percent > 70:
+            if swap_pct > 70:
                 self.registrar_evento(
                     "SWAP_ALTO",
-                    f"Swap: {swap.percent:.1f}% - Considerar expansión",
+                    f"Swap: {swap_pct:.1f}% - Considerar expansión",
                     "WARNING",
                     prioridad=7
                 )
@@ -263,20 +562,22 @@ class GestorMemoria(BaseGestor):
         except Exception as e:
             self.logger.debug(f"Error limpiando standby: {e}")
     
-    def analizar_fragmentacion_memoria(self) -> Dict[str, Any]:
+    def analizar_fragmentacion_memoria(self, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Analiza fragmentación de memoria."""
         try:
-            mem = psutil.virtual_memory()
-            
-            # Calcular fragmentación aproximada
-            fragmentacion_pct = 0.0
-            if mem.available > 0:
-                fragmentacion_pct = ((mem.total - mem.available - mem.used) / 
-                                    mem.total * 100)
+            # Reutiliza las estadísticas ya leídas si se pasan
+            if not stats:
+                stats = self.obtener_uso_memoria_detallado()
+            fisica = stats['memoria_fisica']
+            no_contable = _memoria_no_contable(
+                fisica['total'], fisica['disponible'], fisica['usado'],
+                fisica['buffers'], fisica['cached']
+            )
+            fragmentacion_pct = no_contable / fisica['total'] * 100 if fisica['total'] else 0.0
             
             return {
                 'fragmentacion_estimada_pct': fragmentacion_pct,
-                'memoria_no_contable': mem.total - mem.available - mem.used,
+                'memoria_no_contable': no_contable,
                 'requiere_desfragmentacion': fragmentacion_pct > 15
             }
         
@@ -305,25 +606,20 @@ class GestorMemoria(BaseGestor):
         self._terminar_procesos_agresivo()
         self.logger.debug("Nivel 5: Compresión de memoria activada y limpieza agresiva.")
 
-    def liberar_memoria_agresiva(self, nivel: int = 1) -> bool:
-        """Libera memoria con estrategias de agresividad por niveles (1-5)."""
+    def liberar_memoria_agresiva(self, nivel: int = 1, mem_antes: Optional[int] = None) -> bool:
+        """Libera memoria con estrategias de agresividad por niveles (1-5).
+        
+        `mem_antes` permite reutilizar la lectura de memoria usada que ya hizo el llamador.
+        """
         self.intentos_liberacion += 1
-        mem_antes = psutil.virtual_memory().used
-        
-        limpieza_actions = {
-            1: self._limpieza_nivel_1,
-            2: self._limpieza_nivel_2,
-            3: self._limpieza_nivel_3,
-            4: self._limpieza_nivel_4,
-            5: self._limpieza_nivel_5,
-        }
+        if mem_antes is None:
+            mem_antes = self._memoria_usada()
 
         try:
-            for i in range(1, nivel + 1):
-                if i in limpieza_actions:
-                    limpieza_actions[i]()
+            for limpieza in self._cleanup_levels[:nivel]:
+                limpieza()
             
-            mem_despues = psutil.virtual_memory().used
+            mem_despues = self._memoria_usada()
             liberada = mem_antes - mem_despues
             
             if liberada > 1024 * 1024: # Registrar solo si se libera > 1MB
@@ -358,13 +654,11 @@ class GestorMemoria(BaseGestor):
 
     def _terminar_procesos_agresivo(self):
         """Termina procesos de forma más agresiva, incluyendo algunos que pueden ser importantes."""
-        # Esta lista es peligrosa y debe ser configurable
-        procesos_objetivo = ['chrome.exe', 'firefox.exe', 'Spotify.exe', 'Code.exe']
-        for proc in psutil.process_iter(['name', 'pid']):
-            if proc.info['name'] in procesos_objetivo:
+        # process_iter entrega Process ya validados; se matan sin crear otro objeto
+        for proc in psutil.process_iter(['name']):
+            if proc.info['name'] in _NOMBRES_AGRESIVO:
                 try:
-                    p = psutil.Process(proc.info['pid'])
-                    p.kill()
+                    proc.kill()
                     self.registrar_evento("PROCESO_TERMINADO_AGRESIVO", f"Proceso {proc.info['name']} terminado.", "WARNING")
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
@@ -379,9 +673,9 @@ class GestorMemoria(BaseGestor):
             
             for proc_info in procesos_pesados:
                 try:
-                    proc = psutil.Process(proc_info['pid'])
-                    if proc.name() not in ['explorer.exe', 'svchost.exe', 'csrss.exe']:
-                        proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+                    # El nombre ya viene en la instantánea; solo se toca el proceso para mutarlo
+                    if proc_info['nombre'] not in _NOMBRES_CRITICOS:
+                        self._get_proc(proc_info['pid']).nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
                         procesos_reducidos += 1
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
@@ -391,19 +685,15 @@ class GestorMemoria(BaseGestor):
         
         return procesos_reducidos
     
-    def _terminar_procesos_prescindibles(self) -> int:
+    def _terminar_procesos_prescindibles(self, mem_threshold: float = 10) -> int:
         """Termina procesos que no son críticos y consumen mucha memoria."""
-        procesos_prescindibles = [
-            'chrome.exe', 'firefox.exe', 'slack.exe', 'teams.exe',
-            'java.exe', 'python.exe', 'node.exe'
-        ]
         terminados = 0
         
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'memory_percent']):
+            for info in self._snapshot_processes():
                 try:
-                    if proc.info['name'] in procesos_prescindibles and proc.info['memory_percent'] > 10:
-                        proc.terminate()
+                    if info['nombre'] in _NOMBRES_PRESCINDIBLES and info['memoria_pct'] > mem_threshold:
+                        self._get_proc(info['pid']).terminate()
                         terminados += 1
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
@@ -420,7 +710,22 @@ class GestorMemoria(BaseGestor):
             return
         
         porcentaje = stats['memoria_fisica']['porcentaje']
-        tendencia = self.analizar_tendencia_memoria()
+        # Solo el primer intento de liberación reutiliza la lectura del tick;
+        # los reintentos parten de la memoria que dejó el intento anterior
+        # (total - disponible: la misma medida que _memoria_usada)
+        usado = stats['memoria_fisica']['total'] - stats['memoria_fisica']['disponible']
+        swap_pct = stats['swap']['porcentaje']
+        # Una muestra por tick: las lecturas de estadísticas no alimentan el historial
+        self.historial_uso.append(porcentaje)
+        self.historial_swap.append(swap_pct)
+        self.metricas.registrar('memoria_porcentaje', porcentaje, tags={'swap': swap_pct})
+        
+        # El forecast ARIMA solo se consulta si la regresión lineal ya ve subida
+        pendiente = self._fast_trend()
+        if pendiente > _PENDIENTE_MINIMA:
+            tendencia = self.analizar_tendencia_memoria()
+        else:
+            tendencia = {'tendencia': 'estable', 'pendiente': pendiente}
         
         # Estrategia adaptativa según tendencia
         if tendencia.get('prediccion_5_intervalos', 0) > self.porcentaje_critico:
@@ -439,23 +744,23 @@ class GestorMemoria(BaseGestor):
                 "ERROR",
                 prioridad=10
             )
-            for _ in range(5):
-                if self.liberar_memoria_agresiva(5):
+            for intento in range(5):
+                if self.liberar_memoria_agresiva(5, usado if intento == 0 else None):
                     break
-                __import__('time').sleep(0.5)
+                time.sleep(0.5)
         
         # Nivel crítico
         elif porcentaje > self.porcentaje_critico:
             self.registrar_evento(
-                "MEMORIA_CRITICA",
+                EV_MEMORIA_CRITICA,
                 f"{porcentaje:.1f}% - Actuación agresiva",
                 "ERROR",
                 prioridad=9
             )
-            for _ in range(3):
-                if self.liberar_memoria_agresiva(4):
+            for intento in range(3):
+                if self.liberar_memoria_agresiva(4, usado if intento == 0 else None):
                     break
-                __import__('time').sleep(0.3)
+                time.sleep(0.3)
         
         # Nivel de alerta
         elif porcentaje > self.porcentaje_alerta:
@@ -465,7 +770,7 @@ class GestorMemoria(BaseGestor):
                 "WARNING",
                 prioridad=7
             )
-            self.liberar_memoria_agresiva(3)
+            self.liberar_memoria_agresiva(3, usado)
         
         # Nivel normal pero creciente
         elif tendencia.get('tasa_cambio', 0) > 1:
@@ -475,32 +780,89 @@ class GestorMemoria(BaseGestor):
                 "INFO",
                 prioridad=5
             )
-            self.liberar_memoria_agresiva(2)
+            self.liberar_memoria_agresiva(2, usado)
         
         # Optimización continua
         if self.contador_ejecuciones % 5 == 0:
             self.optimizar_prioridades_memoria()
-            self.optimizar_pagefile_dinamico()
+            self.optimizar_pagefile_dinamico(stats)
+        if self.contador_ejecuciones % 20 == 0:
+            self._purgar_proc_handles()
+    
+    def _snapshot_win_processes(self) -> List[Dict[str, Any]]:
+        """Todos los procesos de Windows en una sola NtQuerySystemInformation (caché 1 s)."""
+        procesos = self._stats_cache.get('procesos_win')
+        if procesos is not None:
+            return procesos
+        
+        ntdll = ctypes.windll.ntdll
+        retorno = ctypes.c_ulong(0)
+        while True:
+            buffer = (ctypes.c_char * len(self._nt_buffer)).from_buffer(self._nt_buffer)
+            status = ntdll.NtQuerySystemInformation(
+                _SYSTEM_PROCESS_INFORMATION_CLASS, buffer, len(self._nt_buffer), ctypes.byref(retorno)
+            ) & 0xFFFFFFFF
+            if status != _STATUS_INFO_LENGTH_MISMATCH:
+                break
+            # El buffer se reutiliza entre llamadas y solo crece
+            del buffer
+            self._nt_buffer = bytearray(max(retorno.value, len(self._nt_buffer)) + 64 * 1024)
+        if status != 0:
+            raise OSError(f"NtQuerySystemInformation: 0x{status:08X}")
+        
+        total = psutil.virtual_memory().total
+        procesos = []
+        offset = 0
+        while True:
+            info = _SYSTEM_PROCESS_INFORMATION.from_buffer(self._nt_buffer, offset)
+            pid = info.UniqueProcessId or 0
+            if pid:
+                nombre = ctypes.wstring_at(info.ImageNameBuffer, info.ImageNameLength // 2)
+                procesos.append({
+                    'pid': pid,
+                    'nombre': nombre,
+                    'memoria_pct': info.WorkingSetSize / total * 100,
+                    'memoria_mb': info.WorkingSetSize / (1024**2),
+                    'threads': info.NumberOfThreads
+                })
+            if not info.NextEntryOffset:
+                break
+            offset += info.NextEntryOffset
+        del info, buffer
+        
+        self._stats_cache.set('procesos_win', procesos, ttl=1.0)
+        return procesos
+    
+    def _snapshot_processes(self) -> List[Dict[str, Any]]:
+        """Lista de procesos compartida por todos los consumidores de un mismo tick (caché 2 s)."""
+        ts, procesos = self._procesos_cache
+        ahora = time.monotonic()
+        if procesos is not None and ahora - ts < 2.0:
+            return procesos
+        
+        procesos = self._snapshot_win_processes() if _ES_WINDOWS else self._leer_procesos()
+        self._procesos_cache = (ahora, procesos)
+        return procesos
+    
+    def _leer_procesos(self) -> List[Dict[str, Any]]:
+        procesos = []
+        for proc in psutil.process_iter(['pid', 'name', 'memory_percent', 'memory_info']):
+            info = proc.info
+            if info['memory_percent'] is None or info['memory_info'] is None:
+                continue
+            procesos.append({
+                'pid': info['pid'],
+                'nombre': info['name'],
+                'memoria_pct': info['memory_percent'],
+                'memoria_mb': info['memory_info'].rss / (1024**2)
+            })
+        return procesos
     
     def obtener_procesos_pesados(self, limite: int = 5) -> List[Dict[str, Any]]:
         """Retorna procesos más pesados en memoria."""
-        procesos = []
-        
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'memory_percent', 'memory_info']):
-                try:
-                    procesos.append({
-                        'pid': proc.info['pid'],
-                        'nombre': proc.info['name'],
-                        'memoria_pct': proc.info['memory_percent'],
-                        'memoria_mb': proc.info['memory_info'].rss / (1024**2)
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-            
-            procesos_top = sorted(procesos, 
-                                 key=lambda x: x['memoria_pct'], 
-                                 reverse=True)[:limite]
+            procesos_top = heapq.nlargest(limite, self._snapshot_processes(),
+                                          key=lambda x: x['memoria_pct'])
             
             self.procesos_monitoreados = {p['pid']: p for p in procesos_top}
             return procesos_top
@@ -511,10 +873,15 @@ class GestorMemoria(BaseGestor):
     
     def obtener_estadisticas(self) -> Dict[str, Any]:
         """Retorna estadísticas completas."""
-        fragmentacion = self.analizar_fragmentacion_memoria()
+        uso_actual = self.obtener_uso_memoria_detallado()
+        fragmentacion = self.analizar_fragmentacion_memoria(uso_actual)
         
         return {
-            'uso_actual': self.obtener_uso_memoria_detallado(),
+            # Valores planos que el orquestador consulta en cada ciclo
+            'metricas_planas': {
+                'mem_pct': uso_actual['memoria_fisica']['porcentaje'] if uso_actual else 0
+            },
+            'uso_actual': uso_actual,
             'tendencia': self.analizar_tendencia_memoria(),
             'procesos_pesados': self.obtener_procesos_pesados(),
             'fragmentacion': fragmentacion,
@@ -540,27 +907,43 @@ class GestorMemoria(BaseGestor):
     def setup_tasks(self) -> None:
         """Configura y añade las tareas de gestión de memoria al scheduler."""
         self.scheduler.add_task(Task("monitorear_memoria", self.monitorear_memoria, timedelta(seconds=15)))
-        self.scheduler.add_task(Task("limpiar_memoria_inteligente", self.limpiar_memoria_inteligente, timedelta(minutes=5)))
+        if _ES_WINDOWS:
+            self.scheduler.add_task(Task("limpiar_memoria_inteligente", self.limpiar_memoria_inteligente, timedelta(minutes=5)))
         self.scheduler.add_task(Task("entrenar_modelo_predictivo_memoria", self.entrenar_modelo_predictivo, timedelta(minutes=5)))
 
+    def _recortar_working_set(self, proc: psutil.Process) -> int:
+        """Vacía el working set de un candidato y retorna los bytes liberados."""
+        try:
+            # process_iter ya leyó memory_info dentro de su oneshot
+            mem_antes = proc.info['memory_info'].rss
+            if not self._vaciar_working_set(proc.pid):
+                return 0
+            return mem_antes - proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return 0
+    
     def limpiar_memoria_inteligente(self) -> None:
         """Limpia la memoria de forma selectiva, centrándose en cachés de procesos inactivos."""
+        # EmptyWorkingSet solo existe en Windows: fuera de él no hay barrido que anunciar
+        if not _ES_WINDOWS:
+            return
         self.registrar_evento("LIMPIEZA_INTELIGENTE", "Iniciando limpieza de memoria inteligente...", "INFO")
-        liberada_total = 0
+        
+        candidatos = []
         for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'cpu_times']):
-            try:
-                # Procesos que no han usado CPU recientemente son buenos candidatos
-                if proc.info['cpu_times'].user < 0.1 and proc.info['memory_info'].rss > 50 * 1024 * 1024: # Umbral más bajo
-                    mem_antes = proc.memory_info().rss
-                    if platform.system() == "Windows":
-                        handle = ctypes.windll.kernel32.OpenProcess(0x1F0FFF, False, proc.info['pid'])
-                        if handle:
-                            ctypes.windll.psapi.EmptyWorkingSet(handle)
-                            ctypes.windll.kernel32.CloseHandle(handle)
-                            mem_despues = psutil.Process(proc.info['pid']).memory_info().rss
-                            liberada_total += mem_antes - mem_despues
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+            info = proc.info
+            if info['cpu_times'] is None or info['memory_info'] is None:
+                continue
+            # Procesos que no han usado CPU recientemente son buenos candidatos
+            if info['cpu_times'].user < 0.1 and info['memory_info'].rss > 50 * 1024 * 1024: # Umbral más bajo
+                candidatos.append(proc)
+        
+        if len(candidatos) >= _MIN_CANDIDATOS_PARALELO:
+            # EmptyWorkingSet bloquea en el kernel y ctypes suelta el GIL durante la llamada
+            with ThreadPoolExecutor(max_workers=_WORKERS_WORKING_SET) as pool:
+                liberada_total = sum(pool.map(self._recortar_working_set, candidatos))
+        else:
+            liberada_total = sum(map(self._recortar_working_set, candidatos))
         
         if liberada_total > 0:
             self.registrar_evento("MEMORIA_INTELIGENTE_LIBERADA", f"Liberados {liberada_total / (1024**2):.2f} MB de cachés de procesos inactivos.", "INFO")
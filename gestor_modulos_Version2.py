@@ -5,31 +5,180 @@ Gestiona sinergias, comunicación inter-módulos y control centralizado.
 ACTUALIZADO con gestor_energia y gestor_disco.
 """
 import sys
+import os
 import platform
+import logging
+import logging.handlers
+import queue
 import threading
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 import json
-from collections import deque
+import importlib
+from functools import wraps
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
-# Importar todos los gestores
-from gestor_gui import GUIManager
-from gestor_energia import GestorEnergia  # NUEVO
-from gestor_kernel import GestorKernel
-from gestor_servicios import GestorServicios
-from gestor_gpu import GestorGPU
-from gestor_redes import GestorRedes
-from gestor_cpu import GestorCPU
-from gestor_tareas import GestorTareas
-from gestor_memoria import GestorMemoria
-from gestor_disco import GestorDisco  # NUEVO
 from base_gestor import ConfigManager
+from core_events import (
+    EV_MEMORIA_CRITICA, EV_CPU_DESBALANCE_CRITICO, EV_GPU_TEMPERATURA_CRITICA,
+    EV_LATENCIA_CRITICA, EV_SERVICIO_DETENIDO, EV_DISCO_LLENO, EV_BATERIA_BAJA
+)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# Logger del orquestador: los hilos calientes solo encolan el LogRecord; el formateo
+# y la escritura en consola los hace el hilo del QueueListener
+logger = logging.getLogger("GestorModulos")
+_log_q: queue.Queue = queue.Queue(-1)
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _iniciar_logger() -> None:
+    """Conecta el logger del orquestador a su QueueListener (una sola vez)."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    consola = logging.StreamHandler(sys.stdout)
+    consola.setFormatter(logging.Formatter('%(message)s'))
+    _log_listener = logging.handlers.QueueListener(_log_q, consola)
+    _log_listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(_log_q))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _detener_logger() -> None:
+    """Vacía la cola de logs pendientes y detiene el listener."""
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    _log_listener = None
+    for handler in [h for h in logger.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        logger.removeHandler(handler)
+
+
+def _dumps(obj) -> bytes:
+    """Serializa un diagnóstico a JSON indentado; tipos desconocidos (datetime, etc.) como texto."""
+    if HAS_ORJSON:
+        return orjson.dumps(
+            obj, default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(obj, indent=2, default=str).encode('utf-8')
+
+# Gestores importados y construidos bajo demanda en GestorModulos.__init__:
+# atributo -> (módulo, clase)
+_GESTORES = {
+    'energia': ('gestor_energia', 'GestorEnergia'),  # NUEVO
+    'kernel': ('gestor_kernel', 'GestorKernel'),
+    'servicios': ('gestor_servicios', 'GestorServicios'),
+    'gpu': ('gestor_gpu', 'GestorGPU'),
+    'redes': ('gestor_redes', 'GestorRedes'),
+    'cpu': ('gestor_cpu', 'GestorCPU'),
+    'tareas': ('gestor_tareas', 'GestorTareas'),
+    'memoria': ('gestor_memoria', 'GestorMemoria'),
+    'disco': ('gestor_disco', 'GestorDisco'),  # NUEVO
+}
+
+
+def _import_and_build(modulo: str, clase: str):
+    """Importa el módulo de un gestor y retorna una instancia nueva."""
+    return getattr(importlib.import_module(modulo), clase)()
+
+
+def _construir_gestores() -> Dict[str, object]:
+    """Importa todos los gestores y después los construye, ambos en serie y en orden fijo.
+    
+    Las importaciones comparten módulos (base_gestor, core_events, numpy...) y los
+    constructores arrancan hilos y se registran en el EventBus/Scheduler compartidos,
+    así que no se solapan.
+    """
+    clases = {
+        atributo: getattr(importlib.import_module(modulo), clase)
+        for atributo, (modulo, clase) in _GESTORES.items()
+    }
+    return {atributo: cls() for atributo, cls in clases.items()}
+
+# Segundos mínimos sin que ninguna tarea de un módulo se ejecute antes de considerarlo
+# caído; cada módulo amplía el suyo a dos veces el periodo de su tarea más frecuente
+_LATIDO_MAXIMO_S = 120
+
+# Tiempo máximo de recolección de estadísticas de todos los módulos por diagnóstico
+_DIAG_TIMEOUT_S = 2.0
+
+# Ventana en la que notificaciones idénticas se agrupan en un único toast
+_NOTIF_VENTANA_S = 2.0
+
+# Nivel de evento -> (título, duración en segundos) de la notificación en GUI
+_NOTIFICACIONES = {
+    "ERROR": ("❌ Error", 5),
+    "WARNING": ("⚠️ Advertencia", 3)
+}
+
+class _HistorialCircular:
+    """Historial de tamaño fijo sobre una lista preasignada y un cursor de escritura."""
+    
+    __slots__ = ('_slots', '_idx', '_count')
+    
+    def __init__(self, maxlen: int):
+        self._slots = [None] * maxlen
+        self._idx = 0
+        self._count = 0
+    
+    def append(self, item) -> None:
+        self._slots[self._idx] = item
+        self._idx = (self._idx + 1) % len(self._slots)
+        if self._count < len(self._slots):
+            self._count += 1
+    
+    def items(self) -> List:
+        """Elementos en orden cronológico (del más antiguo al más reciente)."""
+        if self._count < len(self._slots):
+            return self._slots[:self._count]
+        return self._slots[self._idx:] + self._slots[:self._idx]
+    
+    def __iter__(self):
+        return iter(self.items())
+    
+    def __len__(self) -> int:
+        return self._count
+
+def _cooldown(segundos: float = 30):
+    """Ejecuta la reacción como mucho una vez cada `segundos`; las repeticiones se omiten.
+    
+    Un gestor emite el mismo evento en cada sondeo mientras dura la condición, y
+    algunas reacciones (limpieza de temporales, liberación agresiva) no deben repetirse.
+    """
+    def decorador(reaccion):
+        nombre = reaccion.__name__
+        
+        @wraps(reaccion)
+        def wrapper(self, gestor_modulos):
+            ahora = time.monotonic()
+            with self._cooldown_lock:
+                if ahora - self.last_fired.get(nombre, float('-inf')) < segundos:
+                    self.historial_sinergias.append((nombre, ahora, "omitida"))
+                    return
+                self.last_fired[nombre] = ahora
+            self.historial_sinergias.append((nombre, ahora, "ejecutada"))
+            reaccion(self, gestor_modulos)
+        return wrapper
+    return decorador
 
 class SistemaDesinergias:
     """Sistema de sinergia entre módulos para optimización coordinada."""
     
     def __init__(self):
+        # Reacción -> instante monotónico de su última ejecución
+        self.last_fired: Dict[str, float] = {}
+        self._cooldown_lock = threading.Lock()
         self.reglas_sinergia = {
             'memoria_critica': self._reaccion_memoria_critica,
             'cpu_saturada': self._reaccion_cpu_saturada,
@@ -39,8 +188,19 @@ class SistemaDesinergias:
             'disco_lleno': self._reaccion_disco_lleno,
             'bateria_baja': self._reaccion_bateria_baja
         }
-        self.historial_sinergias = deque(maxlen=500)
+        # Tipo de evento -> reacción coordinada
+        self.dispatch = {
+            EV_MEMORIA_CRITICA: self._reaccion_memoria_critica,
+            EV_CPU_DESBALANCE_CRITICO: self._reaccion_cpu_saturada,
+            EV_GPU_TEMPERATURA_CRITICA: self._reaccion_gpu_caliente,
+            EV_LATENCIA_CRITICA: self._reaccion_red_lenta,
+            EV_SERVICIO_DETENIDO: self._reaccion_servicio_caido,
+            EV_DISCO_LLENO: self._reaccion_disco_lleno,
+            EV_BATERIA_BAJA: self._reaccion_bateria_baja
+        }
+        self.historial_sinergias = _HistorialCircular(500)
     
+    @_cooldown()
     def _reaccion_memoria_critica(self, gestor_modulos):
         """Reacción coordinada ante memoria crítica."""
         gestor_modulos.memoria.liberar_memoria_agresiva(5)
@@ -48,9 +208,10 @@ class SistemaDesinergias:
         gestor_modulos.kernel.limpiar_memoria_virtual()
         gestor_modulos.disco.limpiar_archivos_temporales()
         
-        if gestor_modulos.memoria.obtener_uso_memoria_detallado().get('memoria_fisica', {}).get('porcentaje', 0) > 92:
+        if gestor_modulos.memoria.porcentaje_memoria() > 92:
             gestor_modulos.energia.aplicar_perfil_energia('ahorro')
     
+    @_cooldown()
     def _reaccion_cpu_saturada(self, gestor_modulos):
         """Reacción coordinada ante CPU saturada."""
         gestor_modulos.cpu.distribuir_carga_inteligente()
@@ -58,29 +219,34 @@ class SistemaDesinergias:
         gestor_modulos.kernel.auto_tune_dinamico()
         gestor_modulos.energia.gestionar_termica_cpu()
     
+    @_cooldown()
     def _reaccion_gpu_caliente(self, gestor_modulos):
         """Reacción coordinada ante GPU sobrecalentada."""
         gestor_modulos.gpu._aplicar_cooling_agresivo()
         gestor_modulos.kernel.recuperacion_bajo_estres()
         gestor_modulos.energia.aplicar_perfil_energia('balanced')
     
+    @_cooldown()
     def _reaccion_red_lenta(self, gestor_modulos):
         """Reacción coordinada ante red lenta."""
         gestor_modulos.redes.optimizar_tcp_ip(agresivo=True)
         gestor_modulos.redes.optimizar_dns()
         gestor_modulos.redes.limpiar_conexiones_huerfanas()
     
+    @_cooldown()
     def _reaccion_servicio_caido(self, gestor_modulos):
         """Reacción coordinada ante servicio caído."""
         gestor_modulos.servicios.verificar_servicios_criticos()
         gestor_modulos.servicios.limpiar_procesos_huerfanos()
     
+    @_cooldown()
     def _reaccion_disco_lleno(self, gestor_modulos):
         """Reacción coordinada ante disco lleno."""
         gestor_modulos.disco.limpiar_archivos_temporales()
         gestor_modulos.tareas._tarea_limpiar_temp()
         gestor_modulos.tareas._tarea_compactar_registros()
     
+    @_cooldown()
     def _reaccion_bateria_baja(self, gestor_modulos):
         """Reacción coordinada ante batería baja."""
         gestor_modulos.energia.aplicar_perfil_energia('ahorro_maximo')
@@ -94,26 +260,54 @@ class GestorModulos:
         if not platform.machine().endswith('64'):
             sys.exit("Esta aplicación requiere arquitecturas x64 (64 bits).")
         
+        _iniciar_logger()
         self.config = ConfigManager()
         self.activo = True
         self.paused = False
         self.hilos = []
-        self.historial_diagnosticos = deque(maxlen=100)
-        
-        print("[INIT] Validando arquitectura...")
-        print("[INIT] Inicializando módulos...")
-        
-        # Inicializar módulos
-        self.gui = GUIManager()
-        self.energia = GestorEnergia()  # NUEVO - Reemplazo de prioridades
-        self.kernel = GestorKernel()
-        self.servicios = GestorServicios()
-        self.gpu = GestorGPU()
-        self.redes = GestorRedes()
-        self.cpu = GestorCPU()
-        self.tareas = GestorTareas()
-        self.memoria = GestorMemoria()
-        self.disco = GestorDisco()  # NUEVO
+        self.historial_diagnosticos = _HistorialCircular(100)
+        # Último diagnóstico construido y el tick del bucle principal al que pertenece
+        self._diag_cache = (0, None)
+        # (ventana de 5 s, dict) del último estado de salud construido
+        self._salud_cache = (-1, None)
+        # Último estado aplicado por el auto-tune: None, 'agresivo' o 'normal'
+        self._last_tune_state = None
+        # (título, mensaje) -> [duplicados suprimidos, inicio de ventana, duración]
+        self._notif_dedup: Dict[tuple, list] = {}
+        self._notif_lock = threading.Lock()
+        # (segundo epoch, marca ISO) reutilizada por diagnósticos del mismo segundo
+        self._ts_cache = (0, "")
+        
+        # Escritura de diagnósticos fuera del bucle principal: (archivo, diagnóstico)
+        self._write_q: queue.Queue = queue.Queue(maxsize=2)
+        self._writer = threading.Thread(target=self._escritor_diagnosticos,
+                                        name="Thread-Diagnosticos", daemon=True)
+        self._writer.start()
+        
+        # Recolección paralela de estadísticas; módulo -> petición aún en curso
+        self._diag_pool = ThreadPoolExecutor(max_workers=len(_GESTORES), thread_name_prefix="diag")
+        self._diag_pendientes: Dict[str, Future] = {}
+        
+        logger.info("[INIT] Validando arquitectura...")
+        logger.info("[INIT] Inicializando módulos...")
+        
+        # Inicializar módulos: la GUI primero (Tk), después el resto
+        self.gui = _import_and_build('gestor_gui', 'GUIManager')
+        for atributo, gestor in _construir_gestores().items():
+            setattr(self, atributo, gestor)
+        
+        # Módulos gestionados (sin la GUI) y su nombre visible, en orden fijo
+        self._modulos = (
+            (self.memoria, "Memoria"),
+            (self.cpu, "CPU"),
+            (self.gpu, "GPU"),
+            (self.redes, "Redes"),
+            (self.energia, "Energia"),
+            (self.kernel, "Kernel"),
+            (self.servicios, "Servicios"),
+            (self.tareas, "Tareas"),
+            (self.disco, "Disco")
+        )
         
         # Sistema de sinergias
         self.sinergias = SistemaDesinergias()
@@ -124,7 +318,7 @@ class GestorModulos:
         # Iniciar threads de módulos
         self._iniciar_threads_modulos()
         
-        print("[INIT] ✓ Módulos inicializados correctamente")
+        logger.info("[INIT] ✓ Módulos inicializados correctamente")
         self.registrar_evento_sistema(
             "SISTEMA_INICIADO",
             "Sistema de optimización iniciado correctamente",
@@ -134,252 +328,396 @@ class GestorModulos:
     
     def _conectar_callbacks(self):
         """Conecta callbacks entre módulos para sincronización."""
-        modulos = [
-            self.memoria, self.cpu, self.gpu, self.redes,
-            self.energia, self.kernel, self.servicios, self.tareas, self.disco
-        ]
-        
-        for modulo in modulos:
+        # GUI y notificaciones: todos los eventos
+        for modulo, _ in self._modulos:
             modulo.agregar_callback(self._callback_evento_global)
+        
+        # Sinergias: cada reacción se suscribe solo a su tipo en el bus compartido,
+        # así el resto de eventos no pasa por ninguna tabla de reacciones
+        self.event_bus = self.memoria.event_bus
+        self._suscripciones = []
+        for tipo, reaccion in self.sinergias.dispatch.items():
+            manejador = self._crear_manejador_sinergia(reaccion)
+            self.event_bus.subscribe(tipo, manejador)
+            self._suscripciones.append((tipo, manejador))
+    
+    def _crear_manejador_sinergia(self, reaccion):
+        """Adapta una reacción de SistemaDesinergias a la firma de callback del EventBus."""
+        def manejador(evento):
+            try:
+                reaccion(self)
+            except Exception as e:
+                logger.error(f"[ERROR] Sinergia {evento.tipo}: {e}")
+        return manejador
     
     def _callback_evento_global(self, evento):
-        """Callback global que procesa eventos de todos los módulos."""
+        """Callback global: registra el evento en la GUI y notifica errores y advertencias."""
         try:
             self.gui.agregar_evento_gui(evento.tipo, evento.mensaje, evento.nivel)
             
-            # Activar sinergias según evento
-            if evento.tipo == "MEMORIA_CRITICA":
-                self.sinergias._reaccion_memoria_critica(self)
-            elif evento.tipo == "DESBALANCE_CPU_CRITICO":
-                self.sinergias._reaccion_cpu_saturada(self)
-            elif evento.tipo == "GPU_TEMPERATURA_CRITICA":
-                self.sinergias._reaccion_gpu_caliente(self)
-            elif evento.tipo == "LATENCIA_CRITICA":
-                self.sinergias._reaccion_red_lenta(self)
-            elif evento.tipo == "SERVICIO_DETENIDO":
-                self.sinergias._reaccion_servicio_caido(self)
-            elif evento.tipo == "DISCO_LLENO":
-                self.sinergias._reaccion_disco_lleno(self)
-            elif evento.tipo == "BATERIA_BAJA":
-                self.sinergias._reaccion_bateria_baja(self)
-            
             # Notificaciones en GUI
-            if evento.nivel == "ERROR":
-                self.gui.mostrar_notificacion("❌ Error", evento.mensaje, 5)
-            elif evento.nivel == "WARNING":
-                self.gui.mostrar_notificacion("⚠️ Advertencia", evento.mensaje, 3)
+            notificacion = _NOTIFICACIONES.get(evento.nivel)
+            if notificacion:
+                titulo, duracion = notificacion
+                self._notificar(titulo, evento.mensaje, duracion)
         
         except Exception as e:
-            print(f"[ERROR] Procesando evento: {e}")
+            logger.error(f"[ERROR] Procesando evento: {e}")
+    
+    def _notificar(self, titulo: str, mensaje: str, duracion: int):
+        """Muestra la notificación salvo que sea un duplicado dentro de la ventana de agrupación."""
+        clave = (titulo, mensaje)
+        ahora = time.monotonic()
+        with self._notif_lock:
+            entrada = self._notif_dedup.get(clave)
+            if entrada is not None and ahora - entrada[1] < _NOTIF_VENTANA_S:
+                # [duplicados suprimidos, inicio de ventana, duración]
+                entrada[0] += 1
+                return
+            self._notif_dedup[clave] = [0, ahora, duracion]
+        self.gui.mostrar_notificacion(titulo, mensaje, duracion)
+    
+    def _vaciar_notificaciones(self):
+        """Publica un único toast agregado por cada notificación repetida en su ventana ya cerrada."""
+        ahora = time.monotonic()
+        agregadas = []
+        with self._notif_lock:
+            for clave, (suprimidas, inicio, duracion) in list(self._notif_dedup.items()):
+                if ahora - inicio >= _NOTIF_VENTANA_S:
+                    del self._notif_dedup[clave]
+                    if suprimidas:
+                        agregadas.append((clave, suprimidas, duracion))
+        
+        for (titulo, mensaje), suprimidas, duracion in agregadas:
+            self.gui.mostrar_notificacion(f"{titulo} ×{suprimidas}", mensaje, duracion)
     
     def _iniciar_threads_modulos(self):
-        """Inicia threads de ejecución para cada módulo."""
-        modulos = [
-            (self.memoria, "Memoria"),
-            (self.cpu, "CPU"),
-            (self.gpu, "GPU"),
-            (self.redes, "Redes"),
-            (self.energia, "Energia"),
-            (self.kernel, "Kernel"),
-            (self.servicios, "Servicios"),
-            (self.tareas, "Tareas"),
-            (self.disco, "Disco")
-        ]
+        """Registra las tareas de cada módulo en el scheduler compartido.
+        
+        Un único hilo (Scheduler) ejecuta las tareas de todos los módulos según su
+        intervalo y en serie: una tarea lenta (p. ej. una liberación agresiva de
+        memoria o un `sudo sysctl`) retrasa las demás de esa pasada.
+        """
+        self.scheduler = self.memoria.scheduler
+        fallidos = set()
+        for modulo, nombre in self._modulos:
+            # Un módulo que falla al registrar sus tareas no impide arrancar al resto
+            try:
+                modulo.setup_tasks()
+                logger.info(f"[INIT] ✓ Tareas de {nombre} registradas")
+            except Exception as e:
+                logger.error(f"[ERROR] Configurando tareas de {nombre}: {e}")
+                fallidos.add(id(modulo))
+        self._latidos_maximos = self._calcular_latidos_maximos(fallidos)
         
-        for modulo, nombre in modulos:
-            thread = threading.Thread(target=modulo.run, name=f"Thread-{nombre}", daemon=True)
-            thread.start()
-            self.hilos.append(thread)
-            print(f"[INIT] ✓ Thread {nombre} iniciado")
+        self.scheduler.start()
+        self.hilos.append(self.scheduler.thread)
     
-    def obtener_diagnostico_completo(self) -> Dict:
-        """Retorna diagnóstico completo de todos los módulos."""
+    def _calcular_latidos_maximos(self, fallidos: Set[int]) -> tuple:
+        """Umbral de latido de cada módulo (alineado con `_modulos`).
+        
+        Solo cuentan las tareas sin condición, las únicas con periodo garantizado;
+        un módulo sin ninguna (None) no puede darse por caído por falta de latido.
+        Los módulos cuyo `setup_tasks` falló (ids en `fallidos`) nunca cuentan como activos (0).
+        """
+        periodos: Dict[int, float] = {}
+        with self.scheduler.lock:
+            for task in self.scheduler.tasks:
+                dueno = getattr(task.action, '__self__', None)
+                if dueno is None or task.condition is not None:
+                    continue
+                periodo = task.interval.total_seconds()
+                periodos[id(dueno)] = min(periodo, periodos.get(id(dueno), periodo))
+        return tuple(
+            0 if id(m) in fallidos
+            else max(_LATIDO_MAXIMO_S, 2 * periodos[id(m)]) if id(m) in periodos
+            else None
+            for m, _ in self._modulos
+        )
+    
+    def _iso_now(self) -> str:
+        """Marca ISO con resolución de segundo, formateada una sola vez por segundo."""
+        t = int(time.time())
+        if t != self._ts_cache[0]:
+            self._ts_cache = (t, datetime.fromtimestamp(t).isoformat())
+        return self._ts_cache[1]
+    
+    def obtener_diagnostico_completo(self, contador: Optional[int] = None) -> Dict:
+        """Retorna diagnóstico completo de todos los módulos.
+        
+        Con `contador` (tick de run_all) el diagnóstico se reutiliza dentro del mismo tick.
+        """
+        if contador is not None and self._diag_cache[0] == contador and self._diag_cache[1] is not None:
+            return self._diag_cache[1]
+        
+        # Con un único hilo de scheduler, un módulo está activo si alguna de sus
+        # tareas ha latido dentro de su umbral (Task.run actualiza ultimo_latido)
+        ahora = time.monotonic()
+        vivos = [maximo is None or ahora - m._last_heartbeat < maximo
+                 for (m, _), maximo in zip(self._modulos, self._latidos_maximos)]
+        activos = sum(vivos)
+        total = len(self._modulos)
+        
         diagnostico = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._iso_now(),
             'salud_sistema': {
-                'modulos_activos': sum(1 for h in self.hilos if h.is_alive()),
-                'total_modulos': len(self.hilos),
-                'estado_general': 'saludable' if sum(1 for h in self.hilos if h.is_alive()) == len(self.hilos) else 'degradado'
-            },
-            'cpu': self.cpu.obtener_estadisticas(),
-            'memoria': self.memoria.obtener_estadisticas(),
-            'gpu': self.gpu.obtener_estadisticas(),
-            'redes': self.redes.obtener_estadisticas(),
-            'energia': self.energia.obtener_estadisticas(),
-            'disco': self.disco.obtener_estadisticas(),
-            'servicios': self.servicios.obtener_estadisticas(),
-            'tareas': self.tareas.obtener_estadisticas(),
-            'kernel': self.kernel.obtener_estadisticas()
+                'modulos_activos': activos,
+                'total_modulos': total,
+                'estado_general': 'saludable' if activos == total else 'degradado'
+            }
         }
+        # Una entrada por módulo ('memoria', 'cpu', 'gpu', ...) y las métricas planas
+        # de los que las publican bajo 'metricas_planas' (cpu_pct, mem_pct, ...);
+        # el 'metricas' propio de cada módulo (p. ej. las de cada GPU) no se mezcla
+        metricas = {}
+        for clave, stats in self._recolectar_estadisticas(vivos).items():
+            diagnostico[clave] = stats
+            metricas.update(stats.get('metricas_planas', ()))
+        diagnostico['metricas'] = metricas
         
         self.historial_diagnosticos.append(diagnostico)
+        if contador is not None:
+            self._diag_cache = (contador, diagnostico)
         return diagnostico
     
-    def guardar_diagnostico(self, nombre_archivo: str = None):
-        """Guarda diagnóstico en archivo JSON."""
+    def _recolectar_estadisticas(self, vivos: List[bool]) -> Dict[str, Dict]:
+        """Pide `obtener_estadisticas()` a los módulos vivos en paralelo, con 2 s de límite total.
+        
+        Un módulo sin latido o que no responde a tiempo aparece como {}; mientras su
+        petición anterior siga en curso no se le envía otra, para que no acapare el pool.
+        """
+        futuros = {}
+        for (modulo, nombre), vivo in zip(self._modulos, vivos):
+            if not vivo:
+                continue
+            clave = nombre.lower()
+            pendiente = self._diag_pendientes.get(clave)
+            if pendiente is not None and not pendiente.done():
+                continue
+            futuros[clave] = self._diag_pool.submit(modulo.obtener_estadisticas)
+        
+        wait(futuros.values(), timeout=_DIAG_TIMEOUT_S)
+        
+        resultado = {}
+        for modulo, nombre in self._modulos:
+            clave = nombre.lower()
+            futuro = futuros.get(clave)
+            if futuro is not None and futuro.done():
+                self._diag_pendientes.pop(clave, None)
+                try:
+                    resultado[clave] = futuro.result()
+                except Exception as e:
+                    logger.error(f"[ERROR] Estadísticas de {nombre}: {e}")
+                    resultado[clave] = {}
+            else:
+                if futuro is not None:
+                    self._diag_pendientes[clave] = futuro
+                resultado[clave] = {}
+        return resultado
+    
+    def guardar_diagnostico(self, nombre_archivo: str = None, diagnostico: Optional[Dict] = None):
+        """Encola el diagnóstico para que el hilo escritor lo guarde en JSON."""
         if not nombre_archivo:
             nombre_archivo = f"diagnostico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        if diagnostico is None:
+            diagnostico = self.obtener_diagnostico_completo()
         
-        try:
-            with open(nombre_archivo, 'w', encoding='utf-8') as f:
-                json.dump(self.obtener_diagnostico_completo(), f, indent=2)
-            print(f"[✓] Diagnóstico guardado: {nombre_archivo}")
-            self.registrar_evento_sistema("DIAGNOSTICO_GUARDADO", nombre_archivo, "INFO")
-        except Exception as e:
-            print(f"[ERROR] Guardando diagnóstico: {e}")
+        # Si el escritor va retrasado se descarta el diagnóstico pendiente más antiguo
+        while True:
+            try:
+                self._write_q.put_nowait((nombre_archivo, diagnostico))
+                break
+            except queue.Full:
+                try:
+                    self._write_q.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def _escritor_diagnosticos(self):
+        """Serializa y escribe los diagnósticos encolados; termina al recibir None."""
+        while True:
+            item = self._write_q.get()
+            if item is None:
+                break
+            nombre_archivo, diagnostico = item
+            try:
+                # Escritura en un temporal y rename atómico: un lector nunca ve JSON a medias
+                temporal = nombre_archivo + ".tmp"
+                with open(temporal, 'wb') as f:
+                    f.write(_dumps(diagnostico))
+                os.replace(temporal, nombre_archivo)
+                logger.info(f"[✓] Diagnóstico guardado: {nombre_archivo}")
+                self.registrar_evento_sistema("DIAGNOSTICO_GUARDADO", nombre_archivo, "INFO")
+            except Exception as e:
+                logger.error(f"[ERROR] Guardando diagnóstico: {e}")
     
-    def optimizar_segun_carga(self):
+    def optimizar_segun_carga(self, diagnostico: Optional[Dict] = None):
         """Auto-optimización adaptativa según carga del sistema."""
-        diagnostico = self.obtener_diagnostico_completo()
+        if diagnostico is None:
+            diagnostico = self.obtener_diagnostico_completo()
         
         try:
-            cpu_stats = diagnostico.get('cpu', {}).get('carga', {})
-            cpu_avg = cpu_stats.get('promedio', 0)
+            metricas = diagnostico['metricas']
+            cpu_avg = metricas.get('cpu_pct', 0)
+            mem_pct = metricas.get('mem_pct', 0)
             
-            mem_stats = diagnostico.get('memoria', {}).get('uso_actual', {})
-            if isinstance(mem_stats, dict):
-                mem_pct = mem_stats.get('memoria_fisica', {}).get('porcentaje', 0)
+            logger.info(f"[AUTO-TUNE] CPU: {cpu_avg:.1f}% | MEM: {mem_pct:.1f}%")
+            
+            # Histéresis: se entra por encima del 85% y se sale por debajo del 50%;
+            # entre ambos umbrales se mantiene el estado actual
+            if cpu_avg > 85 or mem_pct > 85:
+                nuevo_estado = 'agresivo'
+            elif cpu_avg < 50 and mem_pct < 50:
+                nuevo_estado = 'normal'
             else:
-                mem_pct = 0
+                nuevo_estado = self._last_tune_state
             
-            print(f"\n[AUTO-TUNE] CPU: {cpu_avg:.1f}% | MEM: {mem_pct:.1f}%")
+            # Solo las transiciones tocan kernel, configuración y GUI
+            if nuevo_estado == self._last_tune_state:
+                return
+            self._last_tune_state = nuevo_estado
             
             # Modo agresivo automático
-            if cpu_avg > 85 or mem_pct > 85:
-                print("[AUTO-TUNE] ⚡ Activando modo agresivo...")
+            if nuevo_estado == 'agresivo':
+                logger.info("[AUTO-TUNE] ⚡ Activando modo agresivo...")
                 self.config.set('kernel.aggressive_mode', True)
                 self.kernel.modo_agresivo = True
                 self.kernel.nivel_agresividad = 5
                 self.gui.mostrar_notificacion("⚡ Auto-Tune", "Modo agresivo activado", 3)
             
-            elif cpu_avg < 50 and mem_pct < 50:
-                print("[AUTO-TUNE] ✓ Desactivando modo agresivo...")
+            else:
+                logger.info("[AUTO-TUNE] ✓ Desactivando modo agresivo...")
                 self.config.set('kernel.aggressive_mode', False)
                 self.kernel.modo_agresivo = False
                 self.kernel.nivel_agresividad = 2
         
         except Exception as e:
-            print(f"[ERROR] Auto-tune: {e}")
+            logger.error(f"[ERROR] Auto-tune: {e}")
     
     def pausar_todos(self):
         """Pausa todos los módulos."""
-        print("[PAUSA] Pausando todos los módulos...")
-        modulos = [
-            self.memoria, self.cpu, self.gpu, self.redes,
-            self.energia, self.kernel, self.servicios, self.tareas, self.disco
-        ]
-        
-        for modulo in modulos:
+        logger.info("[PAUSA] Pausando todos los módulos...")
+        for modulo, _ in self._modulos:
             modulo.pausar()
         
         self.paused = True
-        print("[PAUSA] ✓ Todos los módulos pausados")
+        self._diag_cache = (0, None)
+        logger.info("[PAUSA] ✓ Todos los módulos pausados")
     
     def reanudar_todos(self):
         """Reanuda todos los módulos."""
-        print("[REANUDACION] Reanudando todos los módulos...")
-        modulos = [
-            self.memoria, self.cpu, self.gpu, self.redes,
-            self.energia, self.kernel, self.servicios, self.tareas, self.disco
-        ]
-        
-        for modulo in modulos:
+        logger.info("[REANUDACION] Reanudando todos los módulos...")
+        for modulo, _ in self._modulos:
             modulo.reanudar()
         
         self.paused = False
-        print("[REANUDACION] ✓ Todos los módulos reanudados")
+        self._diag_cache = (0, None)
+        logger.info("[REANUDACION] ✓ Todos los módulos reanudados")
+    
+    def _contar_modulos_con_errores(self) -> int:
+        """Número de módulos con errores registrados (solo lee `contador_errores`)."""
+        return sum(1 for modulo, _ in self._modulos if modulo.contador_errores > 0)
     
     def obtener_estado_salud_sistema(self) -> Dict:
-        """Obtiene estado de salud completo del sistema."""
-        modulos = [
-            (self.memoria, "Memoria"),
-            (self.cpu, "CPU"),
-            (self.gpu, "GPU"),
-            (self.redes, "Redes"),
-            (self.energia, "Energia"),
-            (self.kernel, "Kernel"),
-            (self.servicios, "Servicios"),
-            (self.tareas, "Tareas"),
-            (self.disco, "Disco")
-        ]
+        """Obtiene estado de salud completo del sistema (se reconstruye como mucho cada 5 s)."""
+        ventana = int(time.monotonic() // 5)
+        if self._salud_cache[0] == ventana:
+            return self._salud_cache[1]
         
         salud = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._iso_now(),
             'modulos': {}
         }
         
-        for modulo, nombre in modulos:
+        for modulo, nombre in self._modulos:
             salud['modulos'][nombre] = modulo.obtener_estado_salud()
         
+        self._salud_cache = (ventana, salud)
         return salud
     
     def registrar_evento_sistema(self, tipo: str, mensaje: str, 
                                 nivel: str = "INFO", prioridad: int = 5):
         """Registra evento en el sistema central."""
-        print(f"[{nivel}] {tipo}: {mensaje}")
+        logger.log(getattr(logging, nivel, logging.INFO), f"[{nivel}] {tipo}: {mensaje}")
         self.memoria.registrar_evento(tipo, mensaje, nivel, prioridad)
     
     def run_all(self):
         """Bucle principal de gestión del sistema."""
-        print("\n[RUN] Iniciando bucle principal del gestor...")
+        logger.info("[RUN] Iniciando bucle principal del gestor...")
         
         contador = 0
+        # Ticks de 1 s contra un deadline fijo: el trabajo de cada tick no desplaza el periodo
+        siguiente_tick = time.monotonic()
         while self.activo:
             try:
                 contador += 1
                 
-                if contador % 1 == 0:
-                    try:
-                        diagnostico = self.obtener_diagnostico_completo()
-                        self.gui.actualizar_metricas(diagnostico)
-                    except Exception as e:
-                        pass
+                try:
+                    diagnostico = self.obtener_diagnostico_completo(contador)
+                    # La GUI se queda solo con el último diagnóstico pendiente
+                    self.gui.actualizar_metricas(diagnostico)
+                except Exception as e:
+                    pass
+                
+                self._vaciar_notificaciones()
                 
                 if contador % 10 == 0:
-                    self.optimizar_segun_carga()
+                    # Mismo tick: reutiliza el diagnóstico ya construido
+                    self.optimizar_segun_carga(self.obtener_diagnostico_completo(contador))
                 
                 if contador % 60 == 0:
-                    salud = self.obtener_estado_salud_sistema()
-                    errores = [m for m in salud['modulos'].values() 
-                              if m.get('contador_errores', 0) > 0]
+                    errores = self._contar_modulos_con_errores()
                     if errores:
-                        print(f"\n[ALERTA] Módulos con errores: {len(errores)}")
+                        logger.warning(f"[ALERTA] Módulos con errores: {errores}")
                 
                 if contador % 300 == 0:
-                    self.guardar_diagnostico()
+                    self.guardar_diagnostico(diagnostico=self.obtener_diagnostico_completo(contador))
                 
-                time.sleep(1)
+                siguiente_tick += 1.0
+                espera = siguiente_tick - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                else:
+                    # Tick más largo que el periodo: se reancla en vez de encadenar ticks atrasados
+                    siguiente_tick = time.monotonic()
             
             except KeyboardInterrupt:
-                print("\n[SHUTDOWN] Interrupción del usuario detectada...")
+                logger.info("[SHUTDOWN] Interrupción del usuario detectada...")
                 break
             except Exception as e:
-                print(f"[ERROR] En bucle principal: {e}")
+                logger.error(f"[ERROR] En bucle principal: {e}")
                 time.sleep(5)
+                siguiente_tick = time.monotonic()
         
         self.detener_sistema()
     
     def detener_sistema(self):
         """Detiene el sistema de forma ordenada."""
-        print("\n[SHUTDOWN] Deteniendo sistema...")
+        logger.info("[SHUTDOWN] Deteniendo sistema...")
         
         self.activo = False
         
-        modulos = [
-            self.memoria, self.cpu, self.gpu, self.redes,
-            self.energia, self.kernel, self.servicios, self.tareas, self.disco, self.gui
-        ]
+        for tipo, manejador in self._suscripciones:
+            self.event_bus.unsubscribe(tipo, manejador)
         
-        for modulo in modulos:
+        for modulo, _ in self._modulos:
             modulo.detener()
+        self.gui.detener()
+        # Se marca el scheduler como detenido; su hilo se espera abajo con timeout
+        self.scheduler.running = False
         
-        print("[SHUTDOWN] Esperando a que terminen threads...")
+        logger.info("[SHUTDOWN] Esperando a que terminen threads...")
         for thread in self.hilos:
             thread.join(timeout=5)
         
-        print("[SHUTDOWN] ✓ Sistema detenido correctamente")
+        logger.info("[SHUTDOWN] ✓ Sistema detenido correctamente")
         
         self.guardar_diagnostico("diagnostico_final.json")
+        self._diag_pool.shutdown(wait=False)
+        # Esperar a que el escritor vacíe la cola antes de salir
+        self._write_q.put(None)
+        self._writer.join(timeout=10)
+        _detener_logger()
 
 def main():
     """Función principal."""
@@ -4,6 +4,7 @@ Gestor inteligente de servicios con recuperación automática, análisis avanzad
 watchdog de servicios críticos y detección de anomalías.
 """
 from base_gestor import BaseGestor
+from core_events import EV_SERVICIO_DETENIDO
 from typing import Dict, List, Optional
 import platform
 import psutil
@@ -149,7 +150,7 @@ class GestorServicios(BaseGestor):
                     
                     if servicio.State != "Running":
                         self.registrar_evento(
-                            "SERVICIO_DETENIDO",
+                            EV_SERVICIO_DETENIDO,
                             f"Servicio crítico {nombre_critico} está {servicio.State}",
                             "ERROR",
                             prioridad=9
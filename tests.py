@@ -98,6 +98,140 @@ def test_circuit_breaker_backoff():
     assert breaker.state == CircuitState.OPEN
     assert breaker._current_timeout == 0.2 # Backoff aplicado
 
+@runner.test
+def test_gpu_sampler_generado():
+    """Test del sampler GPU especializado por número de dispositivos."""
+    from concurrent.futures import ThreadPoolExecutor
+    from gestor_gpu_Version2 import _generar_sampler
+
+    handles = (10, 20, 30)
+    serie = _generar_sampler(3, paralelo=False)(lambda h: h + 1, handles, None)
+    assert serie == {'gpu_0': 11, 'gpu_1': 21, 'gpu_2': 31}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        paralelo = _generar_sampler(3, paralelo=True)(lambda h: h + 1, handles, pool.submit)
+    assert paralelo == serie
+
+@runner.test
+def test_config_batch_single_save():
+    """Test de agrupación de escrituras de configuración."""
+    import os
+    import tempfile
+    from base_gestor_Version2 import ConfigManager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = ConfigManager(os.path.join(tmp, "config.json"))
+        saves = []
+        manager.save = lambda: saves.append(1)
+        try:
+            with manager.batch():
+                manager.set('thermal_throttling.soft_threshold', 65)
+                manager.set('thermal_throttling.aggressive_threshold', 72)
+            assert len(saves) == 1
+            assert manager.get('thermal_throttling.soft_threshold') == 65
+        finally:
+            manager.stop_monitoring()
+
+@runner.test
+def test_ring_buffer_historial():
+    """Test del buffer circular del historial de memoria."""
+    from gestor_memoria_Version2 import _RingBuffer
+
+    ring = _RingBuffer(4)
+    for valor in range(1, 7):
+        ring.append(valor)
+    assert len(ring) == 4
+    assert ring.total == 6
+    assert ring.snapshot().tolist() == [3.0, 4.0, 5.0, 6.0]
+    assert ring.last() == 6.0
+
+@runner.test
+def test_memoria_no_contable_linux():
+    """Test de la memoria no contable con contadores de psutil en Linux."""
+    from gestor_memoria_Version2 import _memoria_no_contable
+
+    gib = 1024 ** 3
+    # psutil en Linux: used = total - free - buffers - cached
+    total, free, buffers, cached = 16 * gib, 2 * gib, gib // 2, 6 * gib
+    used = total - free - buffers - cached
+    available = 8 * gib
+    no_contable = _memoria_no_contable(total, available, used, buffers, cached, linux=True)
+    assert no_contable == gib // 2
+    assert no_contable / total * 100 < 15
+    assert _memoria_no_contable(total, total, used, buffers, cached, linux=True) == 0
+
+@runner.test
+def test_construir_gestores():
+    """Test de construcción secuencial de todos los gestores del orquestador."""
+    import sys
+    import types
+    import base_gestor_Version2
+
+    eventos = []
+
+    def modulo_stub(nombre, clase):
+        # Cada gestor registra su construcción; el acceso a la clase marca la importación
+        cls = type(clase, (), {'__init__': lambda self: eventos.append(('build', nombre))})
+        modulo = types.ModuleType(nombre)
+
+        def getattr_modulo(attr):
+            if attr != clase:
+                raise AttributeError(attr)
+            eventos.append(('import', nombre))
+            return cls
+        modulo.__getattr__ = getattr_modulo
+        return modulo
+
+    # El orquestador importa los módulos por su nombre de despliegue (sin _Version2)
+    previos = {nombre: sys.modules.get(nombre) for nombre in ('base_gestor', 'gestor_modulos_Version2')}
+    sys.modules['base_gestor'] = base_gestor_Version2
+    try:
+        from gestor_modulos_Version2 import _GESTORES, _construir_gestores
+        for modulo, clase in _GESTORES.values():
+            previos.setdefault(modulo, sys.modules.get(modulo))
+            sys.modules[modulo] = modulo_stub(modulo, clase)
+
+        gestores = _construir_gestores()
+    finally:
+        for nombre, modulo in previos.items():
+            if modulo is None:
+                sys.modules.pop(nombre, None)
+            else:
+                sys.modules[nombre] = modulo
+
+    modulos = [modulo for modulo, _ in _GESTORES.values()]
+    assert set(gestores) == {'energia', 'kernel', 'servicios', 'gpu', 'redes',
+                             'cpu', 'tareas', 'memoria', 'disco'}
+    for atributo, gestor in gestores.items():
+        assert type(gestor).__name__ == _GESTORES[atributo][1]
+    # Todas las importaciones antes de la primera construcción, ambas en orden fijo
+    assert eventos == [('import', m) for m in modulos] + [('build', m) for m in modulos]
+
+@runner.test
+def test_task_omite_gestor_pausado():
+    """Test de que las tareas de un gestor en pausa laten pero no se ejecutan."""
+    from datetime import datetime, timedelta
+    from base_gestor_Version2 import Task
+
+    class Gestor:
+        def __init__(self):
+            self.ultimo_latido = None
+            self._last_heartbeat = 0.0
+            self.paused = True
+            self.ejecuciones = 0
+
+        def accion(self):
+            self.ejecuciones += 1
+
+    gestor = Gestor()
+    task = Task("accion", gestor.accion, timedelta(seconds=1))
+    task.run()
+    assert gestor.ejecuciones == 0
+    assert isinstance(gestor.ultimo_latido, datetime)
+    gestor.paused = False
+    task.run()
+    assert gestor.ejecuciones == 1
+
 def run_system_tests():
     """Ejecuta tests del sistema y muestra un reporte detallado."""
     report = runner.run_all()